@@ -0,0 +1,171 @@
+import json
+import os
+import re
+import sys
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+from FirmScrap_record import FirmwareRecord, canonical_vendor, load_records as load_json_records, merge_records, save_records
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Columnar copy of the JSON manifests for the analytics side. Vendor/Model are dictionary-encoded,
+# vendor-specific extras ride along as one JSON string column, and ReleaseDate is a parsed date32
+# so "releases after X" can be pushed down to Parquet row-group statistics.
+PARQUET_EXTS = (".parquet", ".pq")
+IPC_EXTS = (".arrow", ".feather", ".ipc")
+ROW_GROUP_SIZE = 16384
+
+DATE_PATTERNS = [
+    (re.compile(r"(\d{4})[-./](\d{1,2})[-./](\d{1,2})"), ("y", "m", "d")),
+    (re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})"), ("m", "d", "y")),
+    (re.compile(r"(\d{1,2})/(\d{4})"), ("m", "y")),
+]
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is required for Parquet/Arrow manifests (pip install pyarrow)")
+
+def is_columnar_path(path: str) -> bool:
+    return path.lower().endswith(PARQUET_EXTS + IPC_EXTS)
+
+def parse_release_date(s: str) -> Optional[date]:
+    for rx, order in DATE_PATTERNS:
+        m = rx.search(s or "")
+        if not m:
+            continue
+        parts = dict(zip(order, (int(g) for g in m.groups())))
+        try:
+            return date(parts["y"], parts["m"], parts.get("d", 1))
+        except ValueError:
+            continue
+    return None
+
+def _schema():
+    dict_str = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("Vendor", dict_str),
+        ("Model", dict_str),
+        ("Version", pa.string()),
+        ("Release", pa.string()),
+        ("ReleaseDate", pa.date32()),
+        ("Download", pa.string()),
+        ("ReleaseNotes", pa.string()),
+        ("Extra", pa.string()),
+    ])
+
+def records_to_table(records: Iterable[FirmwareRecord]):
+    _require_pyarrow()
+    # Sorting by vendor then date keeps row groups narrow, which is what makes the pushed-down filters skip data.
+    recs = sorted(records, key=lambda r: (r.vendor, parse_release_date(r.release) or date.min))
+    cols: Dict[str, List[Any]] = {name: [] for name in _schema().names}
+    for r in recs:
+        cols["Vendor"].append(r.vendor)
+        cols["Model"].append(r.model)
+        cols["Version"].append(r.version)
+        cols["Release"].append(r.release)
+        cols["ReleaseDate"].append(parse_release_date(r.release))
+        cols["Download"].append(r.download)
+        cols["ReleaseNotes"].append(r.release_notes)
+        cols["Extra"].append(json.dumps(r.extra, ensure_ascii=False, sort_keys=True) if r.extra else None)
+    schema = _schema()
+    arrays = [pa.array(cols[f.name], type=f.type.value_type if pa.types.is_dictionary(f.type) else f.type)
+              for f in schema]
+    arrays[0] = arrays[0].dictionary_encode()
+    arrays[1] = arrays[1].dictionary_encode()
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def table_to_records(table) -> List[FirmwareRecord]:
+    cols = {name: table.column(name).to_pylist() for name in table.column_names}
+    n = table.num_rows
+    empty = [""] * n
+    extras = cols.get("Extra") or [None] * n
+    return [
+        FirmwareRecord(
+            vendor=v, model=m, version=ver, release=rel, download=dl, release_notes=rn,
+            extra=json.loads(x) if x else None,
+        )
+        for v, m, ver, rel, dl, rn, x in zip(
+            cols.get("Vendor", empty), cols.get("Model", empty), cols.get("Version", empty),
+            cols.get("Release", empty), cols.get("Download", empty), cols.get("ReleaseNotes", empty), extras,
+        )
+    ]
+
+def export_records(records: Iterable[FirmwareRecord], path: str):
+    table = records_to_table(records)
+    tmp = f"{path}.tmp"
+    if path.lower().endswith(PARQUET_EXTS):
+        pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE, compression="zstd")
+    elif path.lower().endswith(IPC_EXTS):
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=ROW_GROUP_SIZE)
+    else:
+        raise ValueError(f"unknown columnar extension: {path}")
+    os.replace(tmp, path)
+    return table.num_rows
+
+def build_filter(vendor: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None):
+    expr = None
+    def add(e):
+        nonlocal expr
+        expr = e if expr is None else expr & e
+    if vendor:
+        add(ds.field("Vendor") == canonical_vendor(vendor))
+    if since:
+        add(ds.field("ReleaseDate") >= pa.scalar(date.fromisoformat(since), pa.date32()))
+    if until:
+        add(ds.field("ReleaseDate") <= pa.scalar(date.fromisoformat(until), pa.date32()))
+    return expr
+
+def load_table(path: str, vendor: Optional[str] = None, since: Optional[str] = None,
+               until: Optional[str] = None, columns: Optional[List[str]] = None):
+    _require_pyarrow()
+    fmt = "parquet" if path.lower().endswith(PARQUET_EXTS) else "ipc"
+    dataset = ds.dataset(path, format=fmt)
+    return dataset.to_table(columns=columns, filter=build_filter(vendor, since, until))
+
+def load_records(path: str, vendor: Optional[str] = None, since: Optional[str] = None,
+                 until: Optional[str] = None) -> List[FirmwareRecord]:
+    return table_to_records(load_table(path, vendor, since, until))
+
+def load_manifest(path: str) -> List[FirmwareRecord]:
+    return load_records(path) if is_columnar_path(path) else load_json_records(path)
+
+def save_manifest(path: str, records: List[FirmwareRecord]):
+    if is_columnar_path(path):
+        export_records(records, path)
+    else:
+        save_records(path, records)
+
+def _opt(args: List[str], name: str) -> Optional[str]:
+    if name in args:
+        i = args.index(name)
+        if i + 1 < len(args):
+            return args[i + 1]
+    return None
+
+def main():
+    # export <out.parquet|out.arrow> <links.json> [...]    convert (and merge) JSON manifests
+    # show <manifest> [--vendor V] [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+    args = sys.argv[1:]
+    if len(args) >= 3 and args[0] == "export":
+        out_path, inputs = args[1], args[2:]
+        merged = merge_records(load_json_records(p) for p in inputs)
+        n = export_records(merged, out_path)
+        print(f"[+] Exported {n} records -> {out_path}")
+    elif len(args) >= 2 and args[0] == "show":
+        table = load_table(args[1], _opt(args, "--vendor"), _opt(args, "--since"), _opt(args, "--until"))
+        print(f"[+] {table.num_rows} records")
+        for row in table.select(["Vendor", "Model", "Version", "Release", "Download"]).to_pylist()[:20]:
+            print(f"    {row['Vendor']} {row['Model']} {row['Version']} {row['Release']} {row['Download']}")
+    else:
+        print("usage: python FirmScrap_columnar.py export <out.parquet|out.arrow> <links.json> [...]")
+        print("       python FirmScrap_columnar.py show <manifest> [--vendor V] [--since YYYY-MM-DD] [--until YYYY-MM-DD]")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,22 @@
 import time
 import json
 import random
-import os
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from webdriver_manager.chrome import ChromeDriverManager
+from FirmScrap_negative_cache import load_negative_cache, save_negative_cache, negative_reason, mark_negative, clear_negative
+from FirmScrap_record import FirmwareRecord, load_rows
+
+ALL_PRODUCTS_URL = "https://support.dlink.com/AllPro.aspx"
+PRODUCT_INFO_URL = "https://support.dlink.com/ProductInfo.aspx?m={model}"
+MAX_WORKERS = 6
+VENDOR = "D-Link"
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36",
@@ -25,28 +33,62 @@ def setup_driver():
     service = Service(ChromeDriverManager().install())
     return webdriver.Chrome(service=service, options=chrome_options)
 
+def setup_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": random.choice(USER_AGENTS),
+        "Accept-Language": "en-US,en;q=0.9",
+    })
+    return session
+
+def parse_models(html):
+    soup = BeautifulSoup(html, "html.parser")
+    return sorted(set(a["alt"].strip() for a in soup.select("a.aRedirect[alt]")))
+
+def parse_rev_values(html):
+    # None means the page has no ddlHardWare select at all (not rendered server-side), [] means no revisions.
+    soup = BeautifulSoup(html, "html.parser")
+    select_tag = soup.find("select", {"id": "ddlHardWare"})
+    if not select_tag:
+        return None
+    return [opt["value"] for opt in select_tag.find_all("option") if opt.get("value") and "please select" not in opt.text.lower()]
+
+def get_all_models_http(session):
+    try:
+        response = session.get(ALL_PRODUCTS_URL, timeout=20)
+        response.raise_for_status()
+        return parse_models(response.text)
+    except Exception as e:
+        print(f"[-] AllPro.aspx HTTP fetch failed: {e}")
+        return []
+
+def get_rev_values_http(session, model):
+    try:
+        response = session.get(PRODUCT_INFO_URL.format(model=model), timeout=20)
+        response.raise_for_status()
+        return parse_rev_values(response.text)
+    except Exception as e:
+        print(f"[-] {model} ProductInfo HTTP fetch failed: {e}")
+        return None
+
 def get_all_models(driver):
-    driver.get("https://support.dlink.com/AllPro.aspx")
+    driver.get(ALL_PRODUCTS_URL)
     time.sleep(3)
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-    models = set(a["alt"].strip() for a in soup.select("a.aRedirect[alt]"))
-    return sorted(models)
+    return parse_models(driver.page_source)
 
 def get_rev_values(driver, model):
-    url = f"https://support.dlink.com/ProductInfo.aspx?m={model}"
-    driver.get(url)
+    driver.get(PRODUCT_INFO_URL.format(model=model))
     time.sleep(2)
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-    select_tag = soup.find("select", {"id": "ddlHardWare"})
-    if not select_tag:
-        return []
-    return [opt["value"] for opt in select_tag.find_all("option") if opt.get("value") and "please select" not in opt.text.lower()]
+    return parse_rev_values(driver.page_source)
 
-def fetch_firmware_list(model, rev):
+def fetch_firmware_list(session, model, rev):
     timestamp = str(int(time.time() * 1000))
     url = f"https://support.dlink.com/ajax/ajax.ashx?d={timestamp}&action=productfile&lang=en-US&ver={rev}&ac_id=1"
     headers = {
-        "Referer": f"https://support.dlink.com/ProductInfo.aspx?m={model}",
+        "Referer": PRODUCT_INFO_URL.format(model=model),
         "User-Agent": random.choice(USER_AGENTS),
         "X-Requested-With": "XMLHttpRequest",
         "Accept": "application/json, text/javascript, */*; q=0.01",
@@ -54,7 +96,7 @@ def fetch_firmware_list(model, rev):
 
     for attempt in range(3): # Retry 3 times
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = session.get(url, headers=headers, timeout=10)
             response.raise_for_status()
             result = response.json()
             links = []
@@ -63,73 +105,116 @@ def fetch_firmware_list(model, rev):
                     if file.get("filetypename", "").lower() == "firmware":
                         fw_url = file.get("url", "")
                         if fw_url.lower().endswith((".zip", ".bin", ".img", ".tar", ".gz")):
-                            links.append({
-                                "Model": model,
-                                "Rev": rev,
-                                "Version": file.get("name", ""),
-                                "Download": fw_url,
-                                "Date": file.get("date", ""),
-                                "Note": file.get("Note", "")
-                            })
+                            links.append(FirmwareRecord(
+                                vendor=VENDOR,
+                                model=model,
+                                version=file.get("name", ""),
+                                release=file.get("date", ""),
+                                download=fw_url,
+                                extra={"Rev": rev, "Note": file.get("Note", "")},
+                            ).to_dict())
             return links
         except Exception as e:
             print(f"[-] {model} Rev {rev} request failed ({attempt+1}/3): {e}")
             time.sleep(random.uniform(3, 6))
-    return []
+    return None
 
 def save_json(path, data):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
 
-def load_json(path):
-    if os.path.exists(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return []
-    return []
-
 def main():
-    driver = setup_driver()
     output_path = "dlink_current_firmware_links.json"
-    results = load_json(output_path)
-    processed = set((r["Model"], r["Rev"]) for r in results)
+    results = load_rows(output_path, VENDOR)
+    processed = set((r.get("Model", ""), r.get("Rev")) for r in results)
+    session = setup_session()
+    negative = load_negative_cache(VENDOR)
+    driver = None
 
     try:
-        models = get_all_models(driver)
+        models = get_all_models_http(session)
+        if not models:
+            print("[!] Falling back to Selenium for the model list")
+            driver = setup_driver()
+            models = get_all_models(driver)
         print(f"[*] Total model number: {len(models)}")
-
-        for idx, model in enumerate(models, 1):
-            print(f"\n[{idx}/{len(models)}] Model: {model}")
-            revs = get_rev_values(driver, model)
-            if not revs:
-                print("[-] - Rev no exist. Skipped")
-                continue
-
-            for rev in revs:
-                if (model, rev) in processed:
-                    continue
-
-                fw_list = fetch_firmware_list(model, rev)
-                if not fw_list:
-                    print(f"[-] Rev {rev} can't be found")
-                else:
-                    for fw in fw_list:
-                        print(f"[+] {fw['Download']}")
-                        results.append(fw)
-
-                processed.add((model, rev))
-                save_json(output_path, results)
-                time.sleep(random.uniform(2.0, 4.0))
-
-            time.sleep(random.uniform(5.0, 8.0))
+        cached = [m for m in models if negative_reason(negative, VENDOR, m)]
+        if cached:
+            print(f"[*] Skipping {len(cached)} models cached as negative")
+            models = [m for m in models if not negative_reason(negative, VENDOR, m)]
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            futures = {}
+            fallback = []
+            done_models = 0
+
+            def submit_revs(model, revs):
+                if not revs:
+                    print(f"[-] {model} - Rev no exist. Skipped")
+                    mark_negative(negative, VENDOR, model, "rev no exist")
+                    return
+                clear_negative(negative, VENDOR, model)
+                for rev in revs:
+                    if (model, rev) in processed or negative_reason(negative, VENDOR, f"{model}/{rev}"):
+                        continue
+                    processed.add((model, rev))
+                    futures[pool.submit(fetch_firmware_list, session, model, rev)] = ("fw", model, rev)
+
+            def drain():
+                nonlocal done_models
+                while futures:
+                    finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        kind, model, rev = futures.pop(fut)
+                        if kind == "rev":
+                            done_models += 1
+                            revs = fut.result()
+                            if revs is None:
+                                fallback.append(model)
+                                continue
+                            print(f"[{done_models}/{len(models)}] Model: {model} ({len(revs)} revs)")
+                            submit_revs(model, revs)
+                            continue
+                        fw_list = fut.result()
+                        if fw_list is None:
+                            print(f"[-] {model} Rev {rev} request failed")
+                        elif not fw_list:
+                            print(f"[-] {model} Rev {rev} can't be found")
+                            mark_negative(negative, VENDOR, f"{model}/{rev}", "no firmware in productfile")
+                        else:
+                            for fw in fw_list:
+                                print(f"[+] {fw['Download']}")
+                                results.append(fw)
+                        save_json(output_path, results)
+
+            for model in models:
+                futures[pool.submit(get_rev_values_http, session, model)] = ("rev", model, None)
+            drain()
+
+            if fallback:
+                print(f"\n[*] Selenium fallback for {len(fallback)} models")
+                if driver is None:
+                    driver = setup_driver()
+                for idx, model in enumerate(fallback, 1):
+                    print(f"[selenium {idx}/{len(fallback)}] Model: {model}")
+                    try:
+                        revs = get_rev_values(driver, model)
+                        if revs is None:
+                            # The select never rendered; that says nothing about the model, so it is not cached.
+                            print(f"[-] {model} - revision list did not load, not cached")
+                            continue
+                        submit_revs(model, revs)
+                    except Exception as e:
+                        print(f"[!] selenium error: {model} → {e}")
+                drain()
 
         print(f"\n[+] Done! {len(results)} links are saved.")
 
     finally:
-        driver.quit()
+        if driver is not None:
+            driver.quit()
         save_json(output_path, results)
+        save_negative_cache(VENDOR, negative)
         print(f"[+] Done! {output_path}")
 
 if __name__ == "__main__":
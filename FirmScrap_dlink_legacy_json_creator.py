@@ -1,27 +1,43 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import aiohttp
 import json
-import time
 import os
+import sys
+from typing import Dict, List, Optional, Set, Tuple
 from urllib.parse import urljoin, urlparse
 
+from FirmScrap_iis_listing import (
+    parse_listing, load_listing_index, save_listing_index, is_unchanged,
+    conditional_headers, stored_entries, remember_listing,
+)
+from FirmScrap_record import FirmwareRecord, load_rows
+
 BASE_URL = "https://legacyfiles.us.dlink.com/"
 RESULT_FILE = "dlink_legacy_firmware_links.json"
+STATE_FILE = "dlink_legacy_crawl_state.json"
+INDEX_FILE = "dlink_legacy_listing_index.json"
 SAVE_INTERVAL = 10
+STATE_SAVE_INTERVAL = 50
+MAX_WORKERS = 8
+VENDOR = "D-Link"
 
-visited_dirs = set()
-results = []
+def load_json(path, default):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                return default
+    return default
 
-if os.path.exists(RESULT_FILE):
-    with open(RESULT_FILE, "r", encoding="utf-8") as f:
-        try:
-            results = json.load(f)
-        except json.JSONDecodeError:
-            results = []
+def save_json(path, data, indent=4):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    os.replace(tmp, path)
 
-def save_results():
-    with open(RESULT_FILE, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=4, ensure_ascii=False)
+def save_results(results):
+    save_json(RESULT_FILE, results)
     print(f"[*] Saved: {len(results)} links")
 
 def is_directory_link(href):
@@ -34,41 +50,165 @@ def is_firmware_file(href, text):
         return not href.endswith(".pdf")
     return False
 
-def crawl_directory(url, vendor_path=""):
-    time.sleep(0.5)
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code != 200:
-            print(f"[-] Access failed: {url}")
-            return
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        pre_tag = soup.find("pre")
-        if not pre_tag:
-            return
-
-        for a in pre_tag.find_all("a", href=True):
-            href = a['href']
-            full_url = urljoin(url, href)
-            if is_directory_link(href) and "[To Parent Directory]" not in a.text:
-                if full_url not in visited_dirs:
-                    visited_dirs.add(full_url)
-                    sub_vendor_path = urlparse(full_url).path.strip("/")
-                    crawl_directory(full_url, sub_vendor_path)
-            elif is_firmware_file(href, a.text):
-                record = {
-                    "Model": vendor_path,
-                    "Download": urljoin(url, href)
-                }
-                if record not in results:
-                    results.append(record)
-                    print(f"[+] Firmware found: {record['Download']}")
-                    if len(results) % SAVE_INTERVAL == 0:
-                        save_results()
-    except Exception as e:
-        print(f"[!] Exception: {url} → {e}")
-
-crawl_directory(BASE_URL)
-
-save_results()
-print(f"\n[+] Done! {len(results)} links are saved.")
\ No newline at end of file
+def in_scope(path: str, prefixes: List[str]) -> bool:
+    # A directory is kept if it lies under one of the prefixes, or is an ancestor that leads to one.
+    if not prefixes:
+        return True
+    path = path.strip("/").lower()
+    for p in prefixes:
+        if path.startswith(p) or not path or p.startswith(path + "/"):
+            return True
+    return False
+
+async def fetch_listing(session: aiohttp.ClientSession, url: str, headers=None, max_retry=3) -> Tuple[Optional[str], Optional[str]]:
+    # Returns (html, Last-Modified); html is None when the server answered 304 Not Modified.
+    backoff = 1.6
+    for attempt in range(1, max_retry + 1):
+        try:
+            async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as r:
+                if r.status == 304:
+                    return None, headers.get("If-Modified-Since") if headers else None
+                if r.status >= 500 or r.status == 429:
+                    await asyncio.sleep(min(8, backoff ** attempt))
+                    continue
+                if r.status != 200:
+                    print(f"[-] Access failed: {url}")
+                    return "", None
+                return await r.text(errors="ignore"), r.headers.get("Last-Modified")
+        except Exception as e:
+            if attempt == max_retry:
+                print(f"[!] Exception: {url} → {e}")
+                return "", None
+            await asyncio.sleep(min(8, backoff ** attempt))
+    print(f"[-] Access failed: {url}")
+    return "", None
+
+async def crawl(base_url: str, prefixes: List[str], full: bool = False):
+    results = load_rows(RESULT_FILE, VENDOR)
+    index = load_listing_index(INDEX_FILE)
+    skipped = 0
+    seen: Set[Tuple[str, str]] = {(r.get("Model", ""), r.get("Download", "")) for r in results}
+
+    # pending holds every queued-but-unfinished directory; it is the frontier written out for resume.
+    state = load_json(STATE_FILE, {})
+    pending: Dict[str, List] = {}
+    for url, value in (state.get("pending") or {}).items():
+        # State files from before listing stamps were tracked map url -> vendor_path.
+        if isinstance(value, str):
+            pending[url] = [value, None]
+        elif isinstance(value, list) and len(value) == 2:
+            pending[url] = value
+    visited: Set[str] = set(state.get("done") or []) | set(pending)
+    if pending:
+        print(f"[!] Resuming crawl: {len(pending)} pending, {len(visited) - len(pending)} done")
+    else:
+        pending = {base_url: ["", None]}
+        visited = {base_url}
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for url, (vendor_path, stamp) in pending.items():
+        queue.put_nowait((url, vendor_path, stamp))
+
+    done_dirs: Set[str] = visited - set(pending)
+    processed = failed = 0
+    base = len(results)
+
+    def save_state():
+        save_json(STATE_FILE, {"pending": pending, "done": sorted(done_dirs)}, indent=None)
+        save_listing_index(INDEX_FILE, index)
+
+    async with aiohttp.ClientSession() as session:
+        async def worker():
+            nonlocal processed, skipped, failed
+            while True:
+                url, vendor_path, stamp = await queue.get()
+                try:
+                    headers = None if full else conditional_headers(index, url)
+                    html, last_modified = await fetch_listing(session, url, headers)
+                    # Child stamps are only trusted from a listing fetched just now. A 304 means no entry was
+                    # added or removed, but IIS does not bump a directory when a child's own contents change,
+                    # so the stored child stamps may be stale and every child dir is revalidated instead.
+                    fresh = bool(html)
+                    if html is None:
+                        entries = stored_entries(index, url)
+                        index[url]["stamp"] = stamp
+                    elif html:
+                        entries = parse_listing(html)
+                        remember_listing(index, url, stamp, entries, last_modified)
+                    else:
+                        # Left in pending so the next run retries it.
+                        failed += 1
+                        continue
+                    collect = not prefixes or any(vendor_path.lower().startswith(p) for p in prefixes)
+                    for e in entries:
+                        href = e["href"]
+                        full_url = urljoin(url, href)
+                        if is_directory_link(href):
+                            if full_url in visited:
+                                continue
+                            sub_vendor_path = urlparse(full_url).path.strip("/")
+                            if not in_scope(sub_vendor_path, prefixes):
+                                continue
+                            visited.add(full_url)
+                            if not full and fresh and is_unchanged(index, full_url, e["stamp"]):
+                                skipped += 1
+                                continue
+                            pending[full_url] = [sub_vendor_path, e["stamp"]]
+                            queue.put_nowait((full_url, sub_vendor_path, e["stamp"]))
+                        elif collect and is_firmware_file(href, e["name"]):
+                            key = (vendor_path, full_url)
+                            if key in seen:
+                                continue
+                            seen.add(key)
+                            results.append(FirmwareRecord(
+                                vendor=VENDOR,
+                                model=vendor_path,
+                                release=(e["stamp"] or "")[:10],
+                                download=full_url,
+                            ).to_dict())
+                            print(f"[+] Firmware found: {full_url}")
+                            if (len(results) - base) % SAVE_INTERVAL == 0:
+                                save_results(results)
+                    # Only a listing that was actually read counts as done; a cancelled fetch stays pending.
+                    pending.pop(url, None)
+                    done_dirs.add(url)
+                    processed += 1
+                    if processed % STATE_SAVE_INTERVAL == 0:
+                        save_state()
+                        print(f"[*] Frontier: {len(pending)} pending, {processed} listings processed, {skipped} unchanged skipped")
+                except Exception as e:
+                    failed += 1
+                    print(f"[!] Listing error: {url} → {e}")
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(MAX_WORKERS)]
+        try:
+            await queue.join()
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            save_results(results)
+            save_listing_index(INDEX_FILE, index)
+            print(f"[*] {processed} listings fetched, {skipped} unchanged subtrees skipped")
+            if failed:
+                print(f"[!] {failed} listings failed and stay pending; run again to retry them")
+            if pending:
+                save_state()
+            elif os.path.exists(STATE_FILE):
+                os.remove(STATE_FILE)
+
+    return results
+
+def main():
+    args = sys.argv[1:]
+    full = "--full" in args
+    prefixes = [p.strip("/").lower() for p in args if not p.startswith("--") and p.strip("/")]
+    if prefixes:
+        print(f"[*] Restricting crawl to: {', '.join(prefixes)}")
+    results = asyncio.run(crawl(BASE_URL, prefixes, full))
+    print(f"\n[+] Done! {len(results)} links are saved.")
+
+if __name__ == "__main__":
+    main()
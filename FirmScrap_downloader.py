@@ -1,22 +1,175 @@
-import json
 import requests
 import os
+import re
+import sys
 import ftplib
+import json
 import logging
+import shutil
+import signal
+import tempfile
+import threading
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from urllib.parse import urlparse
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
+from FirmScrap_record import load_records, from_dict
+import FirmScrap_columnar as columnar
+from FirmScrap_unpack import UNPACK_WORKERS, unpack_file, result_extras
+from FirmScrap_entropy import profile_file, profile_target, result_extras as entropy_extras
+from FirmScrap_work_queue import BATCH_SIZE, LEASE_TTL, Heartbeat, default_worker_id, open_queue
+
+MAX_WORKERS = 8
+PER_HOST_LIMIT = 2
+SELENIUM_WORKERS = 2
+SELENIUM_START_WAIT = 30
+SELENIUM_DOWNLOAD_TIMEOUT = 1800
+# Hosts that tolerate (or need) a different number of parallel downloads than PER_HOST_LIMIT.
+HOST_LIMITS = {}
+
+CHUNK_SIZE = 64 * 1024
+# Bandwidth budget, re-read whenever it changes (polled every CONTROL_POLL seconds) or on SIGHUP:
+#   {"global_rate": "8M", "per_host_rate": "2M", "host_rates": {"downloads.netgear.com": "1M"}}
+# Rates are bytes per second with an optional K/M/G suffix; 0 or a missing key means unlimited.
+CONTROL_FILE = "download_control.json"
+CONTROL_POLL = 2.0
+# Queue worker mode: how long to wait before asking again while other workers still hold leases.
+QUEUE_IDLE_POLL = 15
 
 logging.basicConfig(filename='download_errors.log', 
                     level=logging.ERROR,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
-def load_json(file_path):
-    with open(file_path, 'r', encoding='utf-8') as file:
-        return json.load(file)
+RATE_RE = re.compile(r"^\s*([\d.]+)\s*([KMG]?)", re.I)
+RATE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+def parse_rate(value):
+    if value in (None, ""):
+        return 0
+    if isinstance(value, (int, float)):
+        return max(0, int(value))
+    m = RATE_RE.match(str(value))
+    return int(float(m.group(1)) * RATE_UNITS[m.group(2).upper()]) if m else 0
+
+class TokenBucket:
+    # Callers take tokens first and sleep off any deficit afterwards, so concurrent threads queue up
+    # behind each other's debt and the aggregate rate holds at chunk granularity.
+    def __init__(self, rate=0):
+        self.lock = threading.Lock()
+        self.rate = 0
+        self.tokens = 0.0
+        self.capacity = 0.0
+        self.stamp = time.monotonic()
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.rate = rate
+            self.capacity = float(max(rate, CHUNK_SIZE))
+            self.tokens = min(self.tokens, self.capacity)
+            self.stamp = time.monotonic()
+
+    def reserve(self, n):
+        with self.lock:
+            if self.rate <= 0:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= n
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class Bandwidth:
+    def __init__(self, control_file=CONTROL_FILE):
+        self.control_file = control_file
+        self.lock = threading.Lock()
+        self.global_bucket = TokenBucket()
+        self.host_buckets = {}
+        self.per_host_rate = 0
+        self.host_rates = {}
+        self.control_mtime = None
+        self.next_poll = 0.0
+        self.reload_requested = False
+
+    def configure(self, global_rate=0, per_host_rate=0, host_rates=None):
+        with self.lock:
+            self.per_host_rate = per_host_rate
+            self.host_rates = dict(host_rates or {})
+            self.global_bucket.set_rate(global_rate)
+            for host, bucket in self.host_buckets.items():
+                bucket.set_rate(self.host_rates.get(host, per_host_rate))
+
+    def _bucket(self, host):
+        with self.lock:
+            bucket = self.host_buckets.get(host)
+            if bucket is None:
+                bucket = self.host_buckets[host] = TokenBucket(self.host_rates.get(host, self.per_host_rate))
+            return bucket
+
+    def maybe_reload(self):
+        now = time.monotonic()
+        if not self.reload_requested and now < self.next_poll:
+            return
+        self.next_poll = now + CONTROL_POLL
+        forced, self.reload_requested = self.reload_requested, False
+        try:
+            mtime = os.stat(self.control_file).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self.control_mtime and not forced:
+            return
+        self.control_mtime = mtime
+        try:
+            with open(self.control_file, "r", encoding="utf-8") as f:
+                cfg = json.load(f)
+        except Exception as e:
+            print(f"[!] Ignoring unreadable {self.control_file}: {e}")
+            return
+        host_rates = {h.lower(): parse_rate(r) for h, r in (cfg.get("host_rates") or {}).items()}
+        self.configure(parse_rate(cfg.get("global_rate")), parse_rate(cfg.get("per_host_rate")), host_rates)
+        print(f"[*] Bandwidth budget: global {cfg.get('global_rate') or 'unlimited'}, "
+              f"per host {cfg.get('per_host_rate') or 'unlimited'}, {len(host_rates)} host overrides")
+
+    def throttle(self, host, n):
+        self.maybe_reload()
+        delay = max(self.global_bucket.reserve(n), self._bucket(host).reserve(n))
+        if delay > 0:
+            time.sleep(delay)
+
+bandwidth = Bandwidth()
+
+# Final paths handed out in this run. Two records can map to the same <model>_<version> name; the later
+# one gets a numbered name instead of overwriting the first while both download concurrently.
+claimed_paths = set()
+claim_lock = threading.Lock()
+
+def claim_path(file_path):
+    root, ext = os.path.splitext(file_path)
+    with claim_lock:
+        candidate = file_path
+        n = 2
+        while candidate in claimed_paths:
+            candidate = f"{root}_{n}{ext}"
+            n += 1
+        claimed_paths.add(candidate)
+    return candidate
+
+def release_path(file_path):
+    with claim_lock:
+        claimed_paths.discard(file_path)
+
+def part_file(file_path):
+    # A unique temp file next to the target, so concurrent downloads (or other worker processes in
+    # the same directory) never share one; the .part suffix keeps it out of the unpack/scan walks.
+    fd, part_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or ".",
+                                     prefix=f"{os.path.basename(file_path)}.", suffix=".part")
+    # mkstemp creates 0600; finished downloads keep the permissions a plain open() would have given them.
+    os.chmod(part_path, 0o644)
+    return os.fdopen(fd, "wb"), part_path
 
 def is_pdf(url):
     file_name = os.path.basename(url)
@@ -34,7 +187,8 @@ def download_file_ftp(url, output_dir, model=None, version=None):
     file_name = os.path.basename(path)
     dir_path = posixpath.dirname(path)
 
-    file_path = os.path.join(output_dir, file_name)
+    file_path = claim_path(os.path.join(output_dir, file_name))
+    part_path = None
 
     try:
         with FTP(hostname, timeout=10) as ftp:
@@ -47,14 +201,28 @@ def download_file_ftp(url, output_dir, model=None, version=None):
                     ftp.cwd(part)
                     print(f" → cd {part}")
 
-            with open(file_path, "wb") as file:
-                ftp.retrbinary(f"RETR {file_name}", file.write)
+            def write_chunk(chunk):
+                bandwidth.throttle(hostname, len(chunk))
+                file.write(chunk)
+
+            file, part_path = part_file(file_path)
+            with file:
+                ftp.retrbinary(f"RETR {file_name}", write_chunk, blocksize=CHUNK_SIZE)
+            os.replace(part_path, file_path)
 
             print(f"[+] FTP download success!: {file_path}")
+            return file_path
 
     except Exception as e:
         print(f"[-] FTP download failed..: {url} - : {e}")
         logging.error(f"FTP download failed..: {url} - : {e}")
+        release_path(file_path)
+    finally:
+        if part_path and os.path.exists(part_path):
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
 
 def sanitize_filename(name):
     return name.replace("/", "_").replace("\\", "_").replace("?", "_").replace("&", "_").replace("=", "_")
@@ -68,7 +236,7 @@ def download_file_http(url, output_dir, model=None, version=None):
         parsed = urlparse(url)
         file_name = os.path.basename(parsed.path)
 
-    file_path = os.path.join(output_dir, file_name)
+    file_path = claim_path(os.path.join(output_dir, file_name))
 
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
@@ -78,30 +246,45 @@ def download_file_http(url, output_dir, model=None, version=None):
         "Accept-Language": "en-US,en;q=0.9"
     }
 
+    # Streamed in CHUNK_SIZE pieces so the bandwidth budget applies while the body is still arriving.
+    host = host_of(url)
+    part_path = None
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-
-        try:
-            with open(file_path, 'wb') as file:
-                file.write(response.content)
-            print(f"[+] HTTP/HTTPS download success!: {file_path}")
-        except Exception as e:
-            error_message = f"[-] HTTP/HTTPS download failed..: {url} - : {e}"
-            print(error_message)
+        with requests.get(url, headers=headers, stream=True, timeout=(15, 60)) as response:
+            response.raise_for_status()
+            file, part_path = part_file(file_path)
+            with file:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if chunk:
+                        bandwidth.throttle(host, len(chunk))
+                        file.write(chunk)
+        os.replace(part_path, file_path)
+        print(f"[+] HTTP/HTTPS download success!: {file_path}")
+        return file_path
     except requests.exceptions.RequestException as e:
         error_message = f"[-] HTTP/HTTPS download failed..: {url} - : {e}"
         print(error_message)
         logging.error(error_message)
+        release_path(file_path)
+    except OSError as e:
+        error_message = f"[-] HTTP/HTTPS download failed..: {url} - : {e}"
+        print(error_message)
+        release_path(file_path)
+    finally:
+        if part_path and os.path.exists(part_path):
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
 
 
 def download_file(url, output_dir, model=None, version=None):
 
     parsed_url = urlparse(url)
     if parsed_url.scheme in ['http', 'https']:
-        download_file_http(url, output_dir, model, version)
+        return download_file_http(url, output_dir, model, version)
     elif parsed_url.scheme == 'ftp':
-        download_file_ftp(url, output_dir, model, version)
+        return download_file_ftp(url, output_dir, model, version)
     else:
         error_message = f"[!] Error: {url}"
         print(error_message)
@@ -130,12 +313,14 @@ def download_with_selenium(url, output_dir):
 
     parsed_url = urlparse(url)
     if parsed_url.scheme == 'ftp':
-        download_file_ftp(url, output_dir)
-        return
+        return download_file_ftp(url, output_dir)
 
+    # Each job gets its own download directory, so the file Chrome saves can be told apart from other
+    # concurrent downloads into the same vendor folder.
+    download_dir = tempfile.mkdtemp(dir=output_dir, prefix=".selenium-")
     chrome_options = Options()
     prefs = {
-        "download.default_directory": os.path.abspath(output_dir),
+        "download.default_directory": os.path.abspath(download_dir),
         "download.prompt_for_download": False,
         "download.directory_upgrade": True,
         "safebrowsing.enabled": True
@@ -145,40 +330,312 @@ def download_with_selenium(url, output_dir):
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
 
+    driver = None
     try:
         driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
         driver.get(url)
         
         print(f"[*] Selenium attempting: {url}")
 
-        #############################################
-        time.sleep(30)
-        #############################################
+        name = wait_for_browser_download(download_dir)
+        if not name:
+            print(f"[-] Selenium download did not finish: {url}")
+            return None
+        file_path = claim_path(os.path.join(output_dir, name))
+        os.replace(os.path.join(download_dir, name), file_path)
+        print(f"[+] Selenium download success!: {file_path}")
+        return file_path
 
     except Exception as e:
         logging.error(f"[!] Selenium error: {url} - {e}")
         print(f"[!] Selenium error: {url} - {e}")
+        return None
     finally:
-        driver.quit()
-
-def download_from_json(json_data):
-    for item in json_data:
-        download_url = item.get("Download") or item.get("ReleaseNotePDF")
-        download_model = item.get("Model")
-        download_version = item.get("Version")
-        if download_url:
-            output_dir = os.path.join('.', vendor_name)
-            os.makedirs(output_dir, exist_ok=True)
-            
-            if select == '1':
-                download_file(download_url, output_dir, download_model, download_version)
-            elif select == '2':
-                download_with_selenium(download_url, output_dir)
+        if driver is not None:
+            driver.quit()
+        shutil.rmtree(download_dir, ignore_errors=True)
+
+def wait_for_browser_download(download_dir):
+    # Chrome writes <name>.crdownload and renames it when done. Wait SELENIUM_START_WAIT for a download
+    # to show up, then for as long as one is in progress (up to SELENIUM_DOWNLOAD_TIMEOUT).
+    started = time.time()
+    while True:
+        names = os.listdir(download_dir)
+        partial = [n for n in names if n.endswith(".crdownload")]
+        finished = [n for n in names if not n.endswith(".crdownload")]
+        if finished and not partial:
+            return finished[0]
+        elapsed = time.time() - started
+        if elapsed > SELENIUM_DOWNLOAD_TIMEOUT or (not partial and elapsed > SELENIUM_START_WAIT):
+            return None
+        time.sleep(1)
+
+SIZE_RE = re.compile(r"([\d.]+)\s*([KMG]?)B?", re.I)
+SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+def known_size(rec):
+    # Length comes from FirmScrap_link_probe; Size is the vendor's own label (e.g. NETGEAR's "25.6 MB").
+    extra = rec.extra or {}
+    if isinstance(extra.get("Length"), int) and extra["Length"] > 0:
+        return extra["Length"]
+    m = SIZE_RE.search(str(extra.get("Size") or ""))
+    if m:
+        try:
+            return int(float(m.group(1)) * SIZE_UNITS[m.group(2).upper()])
+        except ValueError:
+            return None
+    return None
+
+def host_of(url):
+    return (urlparse(url).hostname or "").lower()
+
+def build_queues(records, vendor_name, order):
+    # One queue per (vendor, host), each sorted by size; images of unknown size go last in either order.
+    queues = {}
+    for idx, rec in enumerate(records):
+        url = rec.download or rec.release_notes
+        if not url:
+            continue
+        output_dir = os.path.join('.', vendor_name or rec.vendor or "unknown")
+        queues.setdefault((rec.vendor, host_of(url)), []).append((known_size(rec), idx, rec, url, output_dir))
+    for jobs in queues.values():
+        if order == "small":
+            jobs.sort(key=lambda j: (j[0] is None, j[0] or 0, j[1]))
+        elif order == "large":
+            jobs.sort(key=lambda j: (j[0] is None, -(j[0] or 0), j[1]))
+    # Interleave vendors in the ring so one vendor's many hosts do not crowd out the others.
+    by_vendor = {}
+    for key in queues:
+        by_vendor.setdefault(key[0], []).append(key)
+    ring = []
+    while any(by_vendor.values()):
+        for keys in by_vendor.values():
+            if keys:
+                ring.append(keys.pop(0))
+    return ring, {k: deque(v) for k, v in queues.items()}
+
+def run_job(rec, url, output_dir, select):
+    os.makedirs(output_dir, exist_ok=True)
+    if select == '1':
+        return download_file(url, output_dir, rec.model or None, rec.version or None)
+    elif select == '2':
+        return download_with_selenium(url, output_dir)
+    return None
+
+def apply_unpack(rec, result):
+    rec.extra = {**(rec.extra or {}), **result_extras(result)}
+    if result.get("Error"):
+        print(f"[-] Unpack failed: {result['Source']} - {result['Error']}")
+    else:
+        print(f"[+] Unpacked {result['Path']}: {result['FileType']}, firmware={result.get('Firmware')}")
+
+def apply_entropy(rec, result):
+    rec.extra = {**(rec.extra or {}), **entropy_extras(result)}
+    if result.get("Error"):
+        print(f"[-] Entropy profile failed: {result['Path']} - {result['Error']}")
+    else:
+        print(f"[+] Profiled {result['Path']}: {result['Verdict']}, entropy {result['Entropy']:.3f}")
+
+def download_from_json(records, vendor_name, select, order="small", workers=MAX_WORKERS, per_host=PER_HOST_LIMIT,
+                       unpack=False, entropy=False, on_done=None):
+    ring, queues = build_queues(records, vendor_name, order)
+    total = sum(len(q) for q in queues.values())
+    if select == '2':
+        workers = min(workers, SELENIUM_WORKERS)
+    print(f"[*] {total} downloads over {len(ring)} vendor/host queues ({order} first, {workers} workers, {per_host} per host)")
+    active = {}
+    cursor = 0
+    done = 0
+
+    def next_job():
+        # Round-robin from the cursor to the first queue whose host still has a free slot.
+        nonlocal cursor
+        for step in range(len(ring)):
+            key = ring[(cursor + step) % len(ring)]
+            q = queues[key]
+            host = key[1]
+            if q and active.get(host, 0) < HOST_LIMITS.get(host, per_host):
+                cursor = (cursor + step + 1) % len(ring)
+                return host, q.popleft()
+        return None
+
+    # Finished downloads are handed to a process pool right away, so unpacking and entropy profiling
+    # overlap the remaining downloads. With both enabled, the firmware member picked by the unpack
+    # stage is what gets profiled.
+    post_pool = ProcessPoolExecutor(max_workers=UNPACK_WORKERS) if (unpack or entropy) and select == '1' else None
+    post_jobs = {}
+
+    def finish(rec, ok, error=None):
+        # Called once per record, after its last stage (download, unpack or entropy) is over.
+        if on_done:
+            on_done(rec, ok, error)
+
+    # build_queues drops records without any link; they still need an answer.
+    for rec in records:
+        if not (rec.download or rec.release_notes):
+            finish(rec, False, "no download URL")
+
+    def collect_post(block=False):
+        while post_jobs:
+            finished = wait(post_jobs)[0] if block else [f for f in post_jobs if f.done()]
+            if not finished:
+                return
+            for fut in finished:
+                stage, rec = post_jobs.pop(fut)
+                try:
+                    if stage == "unpack":
+                        apply_unpack(rec, fut.result())
+                        target = profile_target(rec.extra) if entropy else None
+                        if target and os.path.isfile(target):
+                            post_jobs[post_pool.submit(profile_file, target)] = ("entropy", rec)
+                            continue
+                    else:
+                        apply_entropy(rec, fut.result())
+                except Exception as e:
+                    print(f"[-] {stage.capitalize()} error: {rec.download} - {e}")
+                finish(rec, True)
+            if not block:
+                return
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while True:
+                while len(running) < workers:
+                    picked = next_job()
+                    if not picked:
+                        break
+                    host, (_, _, rec, url, output_dir) = picked
+                    active[host] = active.get(host, 0) + 1
+                    running[pool.submit(run_job, rec, url, output_dir, select)] = (host, url, rec)
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    host, url, rec = running.pop(fut)
+                    active[host] -= 1
+                    done += 1
+                    try:
+                        path = fut.result()
+                    except Exception as e:
+                        print(f"[-] Download error: {url} - {e}")
+                        logging.error(f"Download error: {url} - {e}")
+                        finish(rec, False, str(e))
+                        continue
+                    if not path:
+                        finish(rec, False, "download failed")
+                    elif post_pool and path:
+                        if unpack:
+                            post_jobs[post_pool.submit(unpack_file, path)] = ("unpack", rec)
+                        else:
+                            post_jobs[post_pool.submit(profile_file, path)] = ("entropy", rec)
+                    else:
+                        finish(rec, True)
+                collect_post()
+                print(f"[*] progress {done}/{total}")
+        if post_jobs:
+            print(f"[*] Waiting for {len(post_jobs)} post-processing jobs")
+        collect_post(block=True)
+    finally:
+        if post_pool:
+            post_pool.shutdown()
+
+def run_queue_worker(queue, vendor_name, select, order="small", workers=MAX_WORKERS, per_host=PER_HOST_LIMIT,
+                     unpack=False, entropy=False, batch=BATCH_SIZE, ttl=LEASE_TTL, worker_id=None):
+    # Lease a batch, download it with the usual scheduler while a heartbeat keeps the leases alive, and
+    # report every record as soon as it is finished. Runs until the queue has nothing pending or leased.
+    worker_id = worker_id or default_worker_id()
+    print(f"[*] Queue worker {worker_id}: batches of {batch}, lease {ttl}s")
+    heartbeat = Heartbeat(queue, worker_id, ttl).start()
+    done = failed = 0
+    try:
+        while True:
+            leases = queue.lease(worker_id, batch, ttl)
+            if not leases:
+                stats = queue.stats()
+                if not stats["pending"] and not stats["leased"]:
+                    break
+                print(f"[*] Nothing to lease, {stats['leased']} jobs held by other workers; retrying in {QUEUE_IDLE_POLL}s")
+                time.sleep(QUEUE_IDLE_POLL)
+                continue
+            jobs = {}
+            records = []
+            for job in leases:
+                rec = from_dict(job["Record"])
+                jobs[id(rec)] = (job["Id"], job["Attempt"])
+                heartbeat.add(job["Id"], job["Attempt"])
+                records.append(rec)
+
+            def report(rec, ok, error=None):
+                nonlocal done, failed
+                job_id, attempt = jobs.pop(id(rec))
+                if not heartbeat.release(job_id, attempt):
+                    print(f"[!] Not reporting job {job_id}: its lease expired and it was handed out again")
+                    return
+                try:
+                    if ok:
+                        accepted = queue.complete(worker_id, job_id, attempt, rec.extra)
+                    else:
+                        accepted = queue.fail(worker_id, job_id, attempt, error or "")
+                except Exception as e:
+                    print(f"[!] Could not report job {job_id}: {e}")
+                    return
+                if not accepted:
+                    print(f"[!] Queue rejected the report for job {job_id} (lease lost)")
+                elif ok:
+                    done += 1
+                else:
+                    failed += 1
+
+            download_from_json(records, vendor_name, select, order, workers, per_host, unpack, entropy, report)
+            # Anything the scheduler never answered for would otherwise stay leased through the heartbeat forever.
+            for rec in records:
+                if id(rec) in jobs:
+                    report(rec, False, "not processed")
+            print(f"[*] Worker {worker_id}: {done} done, {failed} failed, queue {queue.stats()}")
+    finally:
+        heartbeat.stop()
+    print(f"[+] Queue drained: {done} downloads done, {failed} failed on this worker")
 
 
 if __name__ == "__main__":
-    input_file = input("Enter JSON file path: ").strip()
+    args = sys.argv[1:]
+    # --queue <queue.db | http://host:8765>: take work from a shared FirmScrap_work_queue.py queue instead of a manifest.
+    queue_spec = args[args.index("--queue") + 1] if "--queue" in args else None
+    input_file = None if queue_spec else input("Enter manifest path (.json/.parquet/.arrow): ").strip()
     vendor_name = input("Enter vendor name: ").strip()
-    json_data = load_json(input_file)
+    if queue_spec:
+        records = []
+    elif columnar.is_columnar_path(input_file):
+        records = columnar.load_records(input_file)
+    else:
+        records = load_records(input_file, vendor_name)
     select = input("1. request 2. selenium: ")
-    download_from_json(json_data)
+    order = "large" if "--largest-first" in args else "manifest" if "--manifest-order" in args else "small"
+    workers = int(args[args.index("--workers") + 1]) if "--workers" in args else MAX_WORKERS
+    per_host = int(args[args.index("--per-host") + 1]) if "--per-host" in args else PER_HOST_LIMIT
+    # --rate/--host-rate set the starting budget; download_control.json, when present, overrides it.
+    bandwidth.configure(
+        parse_rate(args[args.index("--rate") + 1]) if "--rate" in args else 0,
+        parse_rate(args[args.index("--host-rate") + 1]) if "--host-rate" in args else 0,
+    )
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda signum, frame: setattr(bandwidth, "reload_requested", True))
+    unpack = "--unpack" in args
+    entropy = "--entropy" in args
+    if queue_spec:
+        queue = open_queue(queue_spec, args[args.index("--token") + 1] if "--token" in args else None)
+        run_queue_worker(
+            queue, vendor_name, select, order, workers, per_host, unpack, entropy,
+            int(args[args.index("--batch") + 1]) if "--batch" in args else BATCH_SIZE,
+            float(args[args.index("--lease") + 1]) if "--lease" in args else LEASE_TTL,
+            args[args.index("--worker-id") + 1] if "--worker-id" in args else None,
+        )
+        queue.close()
+    else:
+        download_from_json(records, vendor_name, select, order, workers, per_host, unpack, entropy)
+        if unpack or entropy:
+            # Unpack results (real type, hashes, firmware member) and entropy profiles go back into the
+            # manifest that was downloaded.
+            columnar.save_manifest(input_file, records)
+            print(f"[+] Post-processing results written back -> {input_file}")
@@ -0,0 +1,244 @@
+import base64
+import json
+import lzma
+import math
+import mmap
+import os
+import sys
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from FirmScrap_columnar import load_manifest, save_manifest
+from FirmScrap_signature_scan import scan_mapped
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ENTROPY_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+BLOCK_SIZE = 64 << 10
+# Blocks are processed in groups so the per-group histogram matrix stays small however big the image is.
+GROUP_BLOCKS = 256
+CURVE_POINTS = 256
+RESULTS_FILE = "entropy_results.json"
+
+# A block is "high" at 7.6 bits/byte or more (binwalk's 0.95 rising edge). Compressed and encrypted
+# images are both mostly high blocks. The chi-square of the byte histogram is ~255 for random data and
+# far above it for deflate and bzip2, but LZMA/xz output is just as uniform (a 7 MB xz of binaries
+# scores ~274). So a uniform image is only called encrypted when it also carries no compression or
+# filesystem header that the signature scan can confirm.
+HIGH_ENTROPY = 7.6
+HIGH_RATIO = 0.9
+MIXED_RATIO = 0.25
+RANDOM_CHI_SQUARE = 400.0
+
+# Headers whose magic and validated fields are long enough that a chance match in random bytes is
+# negligible. gzip and raw LZMA have 3-byte magics that random data produces every few MB, so those
+# hits only count once a few KB actually decode from them.
+CONTAINER_FORMATS = {"squashfs-le", "squashfs-be", "cramfs-le", "cramfs-be", "xz", "bzip2", "zip",
+                     "ubi", "ubifs", "jffs2-le"}
+STREAM_DECODERS = {
+    "gzip": lambda: zlib.decompressobj(16 + zlib.MAX_WBITS),
+    "lzma": lambda: lzma.LZMADecompressor(lzma.FORMAT_ALONE),
+}
+DECODE_PROBE = 64 << 10
+DECODE_MIN_OUTPUT = 4096
+
+def _entropy_py(hist: List[int], length: int) -> float:
+    return -sum(c / length * math.log2(c / length) for c in hist if c)
+
+def _profile_py(mm, size: int, block: int):
+    # Fallback when NumPy is missing: Counter tallies bytes in C, the rest is per-block Python.
+    entropies = []
+    total = [0] * 256
+    for off in range(0, size, block):
+        counts = Counter(mm[off:off + block])
+        hist = [counts.get(b, 0) for b in range(256)]
+        for b, c in enumerate(hist):
+            total[b] += c
+        entropies.append(_entropy_py(hist, min(block, size - off)))
+    return entropies, total
+
+def _profile_np(mm, size: int, block: int):
+    # frombuffer is a view of the mapping, nothing is copied; bincount runs per block and the entropy
+    # of a whole group of blocks is one vectorized expression.
+    data = np.frombuffer(mm, dtype=np.uint8)
+    try:
+        n_blocks = -(-size // block)
+        entropies = np.empty(n_blocks, dtype=np.float64)
+        total = np.zeros(256, dtype=np.int64)
+        for first in range(0, n_blocks, GROUP_BLOCKS):
+            last = min(first + GROUP_BLOCKS, n_blocks)
+            hists = np.empty((last - first, 256), dtype=np.int64)
+            for i in range(first, last):
+                hists[i - first] = np.bincount(data[i * block:(i + 1) * block], minlength=256)
+            total += hists.sum(axis=0)
+            p = hists / hists.sum(axis=1, keepdims=True)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                entropies[first:last] = -np.where(p > 0, p * np.log2(p), 0.0).sum(axis=1)
+        return entropies.tolist(), total.tolist()
+    finally:
+        # The mapping cannot be closed while a NumPy view of it is alive.
+        del data
+
+def chi_square(hist: List[int]) -> float:
+    n = sum(hist)
+    if not n:
+        return 0.0
+    expected = n / 256
+    return sum((c - expected) ** 2 for c in hist) / expected
+
+def _decodes(mm, off: int, name: str) -> bool:
+    try:
+        out = STREAM_DECODERS[name]().decompress(mm[off:off + DECODE_PROBE], DECODE_MIN_OUTPUT)
+    except Exception:
+        return False
+    return len(out) >= DECODE_MIN_OUTPUT
+
+def compression_formats(mm, size: int) -> List[str]:
+    # Compression/filesystem formats present in the image, confirmed as described above.
+    hits, _ = scan_mapped(mm, size)
+    found = set()
+    for h in hits:
+        name = h["Name"]
+        if name in found:
+            continue
+        if name in CONTAINER_FORMATS or (name in STREAM_DECODERS and _decodes(mm, h["Offset"], name)):
+            found.add(name)
+    return sorted(found)
+
+def verdict(high_ratio: float, chi2: float, formats: Optional[List[str]] = None) -> str:
+    if high_ratio >= HIGH_RATIO:
+        return "encrypted" if chi2 < RANDOM_CHI_SQUARE and not formats else "compressed"
+    return "mixed" if high_ratio >= MIXED_RATIO else "plain"
+
+def encode_curve(entropies: List[float], points: int = CURVE_POINTS) -> str:
+    # The per-block curve, folded down to at most `points` buckets (max of each bucket, so a short
+    # encrypted region still shows), quantized to a byte and base64'd to keep manifest rows small.
+    n = len(entropies)
+    if n > points:
+        step = n / points
+        entropies = [max(entropies[int(i * step):max(int((i + 1) * step), int(i * step) + 1)]) for i in range(points)]
+    return base64.b64encode(bytes(min(255, round(e / 8 * 255)) for e in entropies)).decode("ascii")
+
+def decode_curve(curve: str) -> List[float]:
+    return [b / 255 * 8 for b in base64.b64decode(curve)]
+
+def profile_file(path: str, block: int = BLOCK_SIZE) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"Path": path, "BlockSize": block}
+    try:
+        size = os.path.getsize(path)
+        result["Size"] = size
+        if size == 0:
+            result.update({"Entropy": 0.0, "EntropyMax": 0.0, "HighRatio": 0.0, "ChiSquare": 0.0,
+                           "Verdict": "empty", "Curve": "", "Histogram": [0] * 256})
+            return result
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            entropies, hist = (_profile_np if np is not None else _profile_py)(mm, size, block)
+            high = sum(1 for e in entropies if e >= HIGH_ENTROPY) / len(entropies)
+            chi2 = chi_square(hist)
+            # The header scan costs a pass over the file, so it only runs when the statistics alone
+            # would say encrypted.
+            formats = None
+            if high >= HIGH_RATIO and chi2 < RANDOM_CHI_SQUARE:
+                formats = compression_formats(mm, size)
+                result["Formats"] = formats
+        result.update({
+            "Entropy": round(_entropy_py(hist, size), 4),
+            "EntropyMax": round(max(entropies), 4),
+            "HighRatio": round(high, 4),
+            "ChiSquare": round(chi2, 1),
+            "Verdict": verdict(high, chi2, formats),
+            "Curve": encode_curve(entropies),
+            "Histogram": hist,
+        })
+    except Exception as e:
+        result["Error"] = f"{type(e).__name__}: {e}"
+    return result
+
+def result_extras(result: Dict[str, Any]) -> Dict[str, Any]:
+    # The compact subset stored on the manifest record; the full histogram stays in the results file.
+    if result.get("Error"):
+        return {"EntropyError": result["Error"]}
+    return {
+        "Entropy": result["Entropy"],
+        "EntropyMax": result["EntropyMax"],
+        "EntropyHighRatio": result["HighRatio"],
+        "ChiSquare": result["ChiSquare"],
+        "EntropyVerdict": result["Verdict"],
+        "Encrypted": result["Verdict"] == "encrypted",
+        "EntropyCurve": result["Curve"],
+    }
+
+def profile_target(extra: Dict[str, Any]) -> Optional[str]:
+    # After the unpack stage the firmware member is what gets profiled, not the archive around it.
+    local = extra.get("LocalPath")
+    if not local:
+        return None
+    member = extra.get("FirmwareMember")
+    if member and os.path.isdir(f"{local}.extracted"):
+        return os.path.join(f"{local}.extracted", member)
+    return local
+
+def _iter_paths(args: List[str]):
+    for a in args:
+        if os.path.isdir(a):
+            for root, _, files in os.walk(a):
+                for f in files:
+                    if not f.endswith((".part", ".tmp")) and f != RESULTS_FILE:
+                        yield os.path.join(root, f)
+        elif os.path.isfile(a):
+            yield a
+
+def annotate_manifest(manifest_path: str, results: Dict[str, Dict[str, Any]]):
+    records = load_manifest(manifest_path)
+    norm = {os.path.normpath(p): r for p, r in results.items()}
+    tagged = 0
+    for rec in records:
+        extra = rec.extra or {}
+        target = profile_target(extra)
+        r = norm.get(os.path.normpath(target)) if target else None
+        if not r:
+            continue
+        rec.extra = {**extra, **result_extras(r)}
+        tagged += 1
+    save_manifest(manifest_path, records)
+    print(f"[+] {tagged} manifest records annotated -> {manifest_path}")
+
+def main():
+    # python FirmScrap_entropy.py <dir or file> [...] [--manifest links.json]
+    args = sys.argv[1:]
+    manifest = None
+    if "--manifest" in args:
+        i = args.index("--manifest")
+        manifest = args[i + 1] if i + 1 < len(args) else None
+        del args[i:i + 2]
+    paths = list(_iter_paths(args))
+    if not paths:
+        print("usage: python FirmScrap_entropy.py <download dir or file> [...] [--manifest links.json]")
+        return
+    if np is None:
+        print("[!] NumPy not installed, using the slower pure-Python profiler (pip install numpy)")
+    print(f"[*] Profiling {len(paths)} files with {ENTROPY_WORKERS} processes")
+    results: Dict[str, Dict[str, Any]] = {}
+    with ProcessPoolExecutor(max_workers=ENTROPY_WORKERS) as pool:
+        for fut in as_completed([pool.submit(profile_file, p) for p in paths]):
+            r = fut.result()
+            results[r["Path"]] = r
+            if r.get("Error"):
+                print(f"[-] {r['Path']}: {r['Error']}")
+            else:
+                print(f"[+] {r['Path']}: {r['Verdict']}, entropy {r['Entropy']:.3f}, high {r['HighRatio']:.0%}")
+    tmp = f"{RESULTS_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(list(results.values()), f, ensure_ascii=False)
+    os.replace(tmp, RESULTS_FILE)
+    print(f"[+] Done! {len(results)} files -> {RESULTS_FILE}")
+    if manifest:
+        annotate_manifest(manifest, results)
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,52 @@
+import asyncio
+import aiohttp
 import json
 import os
 import time
-import requests
 from bs4 import BeautifulSoup
-import os
+from FirmScrap_record import FirmwareRecord, load_rows
 
 
 BASE_URL = "https://www.foscam.com"
 LIST_API = f"{BASE_URL}/downloads/firmwareajaxjson.html"
 DETAIL_PAGE = f"{BASE_URL}/downloads/firmware_details.html?id="
 OUTPUT_FILE = "foscam_firmware_links.json"
+VENDOR = "Foscam"
+
+MAX_PAGES = 500
+DETAIL_WORKERS = 4
+REQUESTS_PER_SEC = 2.0
+SAVE_EVERY = 10
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0",
     "Referer": "https://www.foscam.com/downloads/index.html"
 }
 
+class RateLimiter:
+    # Spaces request starts at least 1/rate seconds apart across every task sharing the limiter.
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
 def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
 
-def load_json(path):
-    if os.path.exists(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return []
-    return []
-
-def get_model_list():
-    models = []
-    for page in range(1, 20):
+async def produce_models(session, limiter, queue, workers):
+    total = 0
+    for page in range(1, MAX_PAGES + 1):
         params = {
             "big_category": "",
             "count": 20,
@@ -40,79 +55,105 @@ def get_model_list():
             "p": page
         }
         try:
-            resp = requests.get(LIST_API, params=params, headers=HEADERS, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
+            await limiter.wait()
+            async with session.get(LIST_API, params=params, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                resp.raise_for_status()
+                data = await resp.json(content_type=None)
             row = data.get("row")
             if not row:
                 break
             for item in row:
-                models.append({
+                await queue.put({
                     "pid": item["pid"],
                     "Model": item["productname"]
                 })
+            total += len(row)
+            print(f"[*] Page {page}: +{len(row)} models (total {total})")
         except Exception as e:
             print(f"[!] Page {page} request failed: {e}")
             break
-        time.sleep(1.5)
-    return models
+    for _ in range(workers):
+        await queue.put(None)
+    return total
+
+def parse_firmware_detail(html):
+    soup = BeautifulSoup(html, "html.parser")
+    result = []
 
-def extract_firmware_from_detail(pid):
+    model_tag = soup.select_one(".download_list_icon span")
+    model = model_tag.text.strip() if model_tag else ""
+
+    rows = soup.select(".down_table tr")[1:]  # skip header
+    for row in rows:
+        cols = row.find_all("td")
+        if len(cols) < 6:
+            continue
+        version = cols[0].text.strip()
+        release_note = cols[3].text.strip().lower()
+        attention_note = cols[4].text.strip().lower()
+        is_middle = "please upgrade to this version before upgrading" in release_note or \
+                    "please upgrade to this version before upgrading" in attention_note
+        download_tag = cols[5].find("a")
+        if download_tag:
+            link = download_tag.get("href", "")
+            if link and "file.html" in link:
+                full_url = BASE_URL + link
+                result.append(FirmwareRecord(
+                    vendor=VENDOR,
+                    model=model,
+                    version=version,
+                    download=full_url,
+                    extra={"IsMiddle": is_middle},
+                ).to_dict())
+    return result
+
+async def extract_firmware_from_detail(session, limiter, pid):
     try:
-        url = f"{DETAIL_PAGE}{pid}"
-        resp = requests.get(url, headers=HEADERS, timeout=10)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        result = []
-
-        model_tag = soup.select_one(".download_list_icon span")
-        model = model_tag.text.strip() if model_tag else ""
-
-        rows = soup.select(".down_table tr")[1:]  # skip header
-        for row in rows:
-            cols = row.find_all("td")
-            if len(cols) < 6:
-                continue
-            version = cols[0].text.strip()
-            release_note = cols[3].text.strip().lower()
-            attention_note = cols[4].text.strip().lower()
-            is_middle = "please upgrade to this version before upgrading" in release_note or \
-                        "please upgrade to this version before upgrading" in attention_note
-            download_tag = cols[5].find("a")
-            if download_tag:
-                link = download_tag.get("href", "")
-                if link and "file.html" in link:
-                    full_url = BASE_URL + link
-                    result.append({
-                        "Model": model,
-                        "Version": version,
-                        "Download": full_url,
-                        "IsMiddle": is_middle
-                    })
-        return result
+        await limiter.wait()
+        async with session.get(f"{DETAIL_PAGE}{pid}", timeout=aiohttp.ClientTimeout(total=10)) as resp:
+            resp.raise_for_status()
+            html = await resp.text(errors="ignore")
+        return parse_firmware_detail(html)
     except Exception as e:
         print(f"[!] Detail metadata extract error (pid: {pid}): {e}")
         return []
 
+async def _amain():
+    results = load_rows(OUTPUT_FILE, VENDOR)
+    collected = {(r.get("Model", ""), r.get("Version", "")) for r in results}
+    limiter = RateLimiter(REQUESTS_PER_SEC)
+    queue = asyncio.Queue(maxsize=DETAIL_WORKERS * 10)
+    base = len(results)
+    checked = 0
 
-def main():
-    results = load_json(OUTPUT_FILE)
-    collected = {(r["Model"], r["Version"]) for r in results}
-
-    models = get_model_list()
-    print(f"[*] Total model number: {len(models)}")
-
-    for idx, item in enumerate(models, 1):
-        print(f"[{idx}/{len(models)}] {item['Model']} checking...")
-        fw_list = extract_firmware_from_detail(item["pid"])
-        new_items = [fw for fw in fw_list if (fw["Model"], fw["Version"]) not in collected]
-        if new_items:
-            results.extend(new_items)
-            save_json(OUTPUT_FILE, results)
-            print(f"[*] Saved: {len(new_items)} links")
-        time.sleep(2.0)
+    async def consume():
+        nonlocal checked
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            fw_list = await extract_firmware_from_detail(session, limiter, item["pid"])
+            checked += 1
+            new_items = [fw for fw in fw_list if (fw.get("Model", ""), fw.get("Version", "")) not in collected]
+            for fw in new_items:
+                collected.add((fw.get("Model", ""), fw.get("Version", "")))
+                results.append(fw)
+                if (len(results) - base) % SAVE_EVERY == 0:
+                    save_json(OUTPUT_FILE, results)
+                    print(f"[*] Saved: {len(results) - base} new links")
+            print(f"[{checked}] {item['Model']}: +{len(new_items)}")
 
+    async with aiohttp.ClientSession(headers=HEADERS) as session:
+        consumers = [asyncio.create_task(consume()) for _ in range(DETAIL_WORKERS)]
+        total = await produce_models(session, limiter, queue, DETAIL_WORKERS)
+        await asyncio.gather(*consumers)
+        print(f"[*] Total model number: {total}")
+
+    save_json(OUTPUT_FILE, results)
     print(f"\n[+] Done! {len(results)} links are saved.")
 
+def main():
+    asyncio.run(_amain())
+
 if __name__ == "__main__":
     main()
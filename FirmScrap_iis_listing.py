@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from html import unescape
+from typing import Any, Dict, List, Optional
+
+PARENT_LABEL = "[To Parent Directory]"
+
+PRE_RE = re.compile(r"<pre\b[^>]*>(.*?)</pre>", re.I | re.S)
+LINE_SPLIT_RE = re.compile(r"<br\s*/?>|\n", re.I)
+ANCHOR_RE = re.compile(r'<a\b[^>]*?\bhref\s*=\s*"([^"]*)"[^>]*>(.*?)</a>', re.I | re.S)
+TAG_RE = re.compile(r"<[^>]+>")
+STAMP_RE = re.compile(r"(\d{1,2}/\d{1,2}/\d{4})\s+(\d{1,2}:\d{2})\s*([AP]M)", re.I)
+SIZE_RE = re.compile(r"(\d+|<dir>)\s*$", re.I)
+
+def _parse_stamp(prefix: str) -> Optional[str]:
+    m = STAMP_RE.search(prefix)
+    if not m:
+        return None
+    raw = f"{m.group(1)} {m.group(2)} {m.group(3).upper()}"
+    try:
+        return datetime.strptime(raw, "%m/%d/%Y %I:%M %p").strftime("%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
+
+def parse_listing(html: str) -> List[Dict[str, Any]]:
+    # IIS directory listings put one entry per <br>-separated line inside a single <pre>:
+    #   " 1/15/2019  3:22 PM        &lt;dir&gt; <A HREF="/TEW-432BRP/">TEW-432BRP</A><br>"
+    m = PRE_RE.search(html or "")
+    if not m:
+        return []
+    entries = []
+    for line in LINE_SPLIT_RE.split(m.group(1)):
+        a = ANCHOR_RE.search(line)
+        if not a:
+            continue
+        name = unescape(TAG_RE.sub("", a.group(2))).strip()
+        if PARENT_LABEL in name:
+            continue
+        href = unescape(a.group(1)).strip()
+        if not href:
+            continue
+        prefix = unescape(TAG_RE.sub("", line[:a.start()]))
+        size_m = SIZE_RE.search(prefix)
+        size_txt = size_m.group(1).lower() if size_m else ""
+        entries.append({
+            "name": name,
+            "href": href,
+            "is_dir": href.endswith("/") or size_txt == "<dir>",
+            "size": int(size_txt) if size_txt.isdigit() else None,
+            "stamp": _parse_stamp(prefix),
+            "prefix": prefix,
+        })
+    return entries
+
+# Listing index: remembers every crawled directory so refreshes can skip leaf directories whose
+# timestamp in the parent listing has not moved, and revalidate the rest with If-Modified-Since.
+#   {url: {"stamp": ..., "hash": ..., "last_modified": ..., "entries": [[href, name, stamp, is_dir], ...]}}
+
+def load_listing_index(path: str) -> Dict[str, Dict[str, Any]]:
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+    return {}
+
+def save_listing_index(path: str, index: Dict[str, Dict[str, Any]]) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def listing_hash(entries: List[Dict[str, Any]]) -> str:
+    h = hashlib.sha1()
+    for e in sorted(entries, key=lambda x: x["href"]):
+        h.update(f"{e['href']}\t{e['stamp'] or ''}\t{e['size'] or ''}\n".encode("utf-8"))
+    return h.hexdigest()
+
+def is_unchanged(index: Dict[str, Dict[str, Any]], url: str, stamp: Optional[str]) -> bool:
+    # IIS bumps a directory's timestamp only when its direct children change, not when something lands
+    # deeper down, so the stamp vouches for the whole subtree only if the directory had no subdirectories.
+    rec = index.get(url)
+    if not (rec and stamp and rec.get("stamp") == stamp):
+        return False
+    return not any(is_dir for _, _, _, is_dir in rec.get("entries") or [])
+
+def conditional_headers(index: Dict[str, Dict[str, Any]], url: str) -> Dict[str, str]:
+    rec = index.get(url) or {}
+    if rec.get("last_modified"):
+        return {"If-Modified-Since": rec["last_modified"]}
+    return {}
+
+def stored_entries(index: Dict[str, Dict[str, Any]], url: str) -> List[Dict[str, Any]]:
+    rec = index.get(url) or {}
+    return [
+        {"href": href, "name": name, "stamp": stamp, "is_dir": is_dir, "size": None, "prefix": ""}
+        for href, name, stamp, is_dir in rec.get("entries") or []
+    ]
+
+def remember_listing(index: Dict[str, Dict[str, Any]], url: str, stamp: Optional[str],
+                     entries: List[Dict[str, Any]], last_modified: Optional[str] = None) -> bool:
+    # Returns True when the listing differs from what was stored on the previous run.
+    new_hash = listing_hash(entries)
+    old = index.get(url) or {}
+    index[url] = {
+        "stamp": stamp,
+        "hash": new_hash,
+        "last_modified": last_modified,
+        "entries": [[e["href"], e["name"], e["stamp"], e["is_dir"]] for e in entries],
+    }
+    return old.get("hash") != new_hash
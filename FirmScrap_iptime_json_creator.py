@@ -1,18 +1,22 @@
 import asyncio, aiohttp, json, os, re, sys, tempfile, time, random
-from typing import Any, Dict, List, Set, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 from urllib.parse import urljoin, urlparse
 from html import unescape
+from FirmScrap_record import FirmwareRecord, load_rows
 
 BASE = "https://iptime.com"
 LIST_TMPL = BASE + "/iptime/?pageid={pid}&page_id=126&dffid=1"
 
 OUT_FW = "iptime_firmware_links.json"
+OUT_POSTS = "iptime_known_posts.json"
 VENDOR = "ipTIME"
 
 MAX_CONC = 10
 SAVE_EVERY = 25
 MAX_EMPTY_PAGES = 5
 MAX_PAGES = 50
+PREFETCH_PAGES = 3
+KNOWN_STOP_RUN = 10
 MIN_HTML = 2000
 
 UA = [
@@ -127,10 +131,20 @@ def _guess_version_from_url(u: str) -> str:
     m = re.search(r'[_-]v?(\d+(?:\.\d+)*(?:\([A-Za-z0-9_.-]+\))?)', base, flags=re.I)
     return m.group(1) if m else ""
 
+def _post_uid(url: str) -> str:
+    m = re.search(r"[?&]uid=(\d+)", url or "")
+    return m.group(1) if m else url
+
+POST_CONTENT_RE = re.compile(r'<div[^>]+class="kboard-document[^"]*"[^>]*>(.*?)</div>\s*</div>', re.I | re.S)
+
+def is_complete_post(html: str) -> bool:
+    # A real post page carries the kboard document body; short or stub pages (rate limiting, errors) do not.
+    return bool(html) and len(html) >= MIN_HTML and "kboard-document" in html
+
 def parse_post_page(html: str, fallback_title: str, fallback_date: str) -> List[Dict[str,Any]]:
     if not html or len(html) < MIN_HTML:
         return []
-    content_match = re.search(r'<div[^>]+class="kboard-document[^"]*"[^>]*>(.*?)</div>\s*</div>', html, flags=re.I|re.S)
+    content_match = POST_CONTENT_RE.search(html)
     scope = content_match.group(1) if content_match else html
     urls = re.findall(r'href="(https?://[^"]+)"', scope, flags=re.I)
     urls = [unescape(u) for u in urls]
@@ -140,16 +154,14 @@ def parse_post_page(html: str, fallback_title: str, fallback_date: str) -> List[
             continue
         model = _guess_model_from_url(u)
         version = _guess_version_from_url(u)
-        rows.append({
-            "Vendor": VENDOR,
-            "Model": model,
-            "Version": version,
-            "Release": _clean(fallback_date),
-            "Download": u,
-            "ReleaseNotes": "",
-            "Type": "Firmware",
-            "Title": fallback_title
-        })
+        rows.append(FirmwareRecord(
+            vendor=VENDOR,
+            model=model,
+            version=version,
+            release=_clean(fallback_date),
+            download=u,
+            extra={"Type": "Firmware", "Title": fallback_title},
+        ).to_dict())
     if not rows:
         mver = re.search(r'펌웨어\s*버전\s*[:：]\s*([0-9A-Za-z.\-_\(\)]+)', scope)
         ver_txt = mver.group(1) if mver else ""
@@ -158,118 +170,149 @@ def parse_post_page(html: str, fallback_title: str, fallback_date: str) -> List[
             if not _is_fw_url(href):
                 continue
             model = _guess_model_from_url(href) or _clean(re.sub(r"<[^>]+>"," ",label)).upper()
-            rows.append({
-                "Vendor": VENDOR,
-                "Model": model,
-                "Version": ver_txt or _guess_version_from_url(href),
-                "Release": _clean(fallback_date),
-                "Download": href,
-                "ReleaseNotes": "",
-                "Type": "Firmware",
-                "Title": fallback_title
-            })
+            rows.append(FirmwareRecord(
+                vendor=VENDOR,
+                model=model,
+                version=ver_txt or _guess_version_from_url(href),
+                release=_clean(fallback_date),
+                download=href,
+                extra={"Type": "Firmware", "Title": fallback_title},
+            ).to_dict())
     return rows
 
-async def fetch_post_and_extract(session: aiohttp.ClientSession, item: Dict[str,str], idx: int, total: int) -> Tuple[str, List[Dict[str,Any]]]:
+async def fetch_post_and_extract(session: aiohttp.ClientSession, item: Dict[str,str], idx: int, total: int) -> Tuple[str, Optional[List[Dict[str,Any]]]]:
+    # rows is None when the post could not be read completely, so it is neither known nor skipped next time.
     url = item["url"]; title = item.get("title",""); date = item.get("date","")
     print(f"[*] [{idx}/{total}] post: fetching {url}")
     html = await fetch_html(session, url)
     if not html:
         print(f"[-] [{idx}/{total}] post: fetch failed {url}")
-        return url, []
+        return url, None
     rows = parse_post_page(html, title, date)
     if rows:
         print(f"[+] [{idx}/{total}] post: {len(rows)} firmware links")
-    else:
+    elif is_complete_post(html):
         print(f"[-] [{idx}/{total}] post: no firmware links")
+    else:
+        print(f"[-] [{idx}/{total}] post: incomplete page ({len(html)} chars), will retry next run")
+        return url, None
     return url, rows
 
-async def harvest_all():
+async def harvest_all(incremental: bool = False):
     headers = {"User-Agent": random.choice(UA), "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"}
-    sem = asyncio.Semaphore(MAX_CONC)
-    records: List[Dict[str,Any]] = []
-    old = load_json(OUT_FW)
-    if isinstance(old, list):
-        records = old
+    records: List[Dict[str,Any]] = load_rows(OUT_FW, VENDOR)
     seen: Set[Tuple[str,str]] = {(r.get("Model",""), r.get("Download","")) for r in records}
+    known_posts: Set[str] = set(load_json(OUT_POSTS) or [])
+    if incremental:
+        print(f"[*] incremental mode: {len(known_posts)} known posts, stopping after {KNOWN_STOP_RUN} known in a row")
+
+    def checkpoint(tag: str):
+        try:
+            save_json(OUT_FW, records)
+        except PermissionError:
+            time.sleep(0.2)
+            save_json(OUT_FW, records)
+        save_json(OUT_POSTS, sorted(known_posts, key=lambda u: int(u) if u.isdigit() else 0))
+        print(f"[*] {tag}: total {len(records)} -> {OUT_FW}")
+
+    post_queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_CONC * 4)
+    base = len(records)
+    discovered = 0
+    done = 0
 
     async with aiohttp.ClientSession(headers=headers) as session:
-        page = 1
-        empty_streak = 0
-        all_posts: List[Dict[str,str]] = []
-        while page <= MAX_PAGES:
-            list_url = LIST_TMPL.format(pid=page)
-            print(f"[*] list page {page}: fetching")
-            html = await fetch_html(session, list_url)
-            items = parse_list_page(html)
-            if not items:
-                empty_streak += 1
-                print(f"[-] list page {page}: no items (empty_streak={empty_streak})")
-                if empty_streak >= MAX_EMPTY_PAGES:
-                    break
-                page += 1
-                continue
+        # List pages are fetched PREFETCH_PAGES ahead but consumed in order; every post on a page
+        # goes straight to the post workers, so post fetching overlaps with the rest of the list walk.
+        async def list_producer():
+            nonlocal discovered
+            queued: Set[str] = set()
+            prefetch: Dict[int, asyncio.Task] = {}
+            next_fetch = 1
+            page = 1
             empty_streak = 0
-            all_posts.extend(items)
-            print(f"[+] list page {page}: +{len(items)} posts (total posts {len(all_posts)})")
-            page += 1
-        if page > MAX_PAGES:
-            print(f"[*] reached MAX_PAGES={MAX_PAGES}, stopping list scan")
-
-        if not all_posts:
-            print("[-] no posts discovered, exiting")
-            save_json(OUT_FW, records)
-            print(f"[+] Firmware saved: total {len(records)} -> {OUT_FW}")
-            return
+            known_run = 0
+            try:
+                while page <= MAX_PAGES:
+                    while len(prefetch) < PREFETCH_PAGES and next_fetch <= MAX_PAGES:
+                        prefetch[next_fetch] = asyncio.create_task(fetch_html(session, LIST_TMPL.format(pid=next_fetch)))
+                        next_fetch += 1
+                    print(f"[*] list page {page}: fetching")
+                    items = parse_list_page(await prefetch.pop(page))
+                    if not items:
+                        empty_streak += 1
+                        print(f"[-] list page {page}: no items (empty_streak={empty_streak})")
+                        if empty_streak >= MAX_EMPTY_PAGES:
+                            break
+                        page += 1
+                        continue
+                    empty_streak = 0
+                    added = 0
+                    for it in items:
+                        uid = _post_uid(it["url"])
+                        if incremental and uid in known_posts:
+                            known_run += 1
+                            continue
+                        known_run = 0
+                        if uid in queued:
+                            continue
+                        queued.add(uid)
+                        discovered += 1
+                        added += 1
+                        await post_queue.put(it)
+                    print(f"[+] list page {page}: +{added} posts (total posts {discovered})")
+                    if incremental and known_run >= KNOWN_STOP_RUN:
+                        print(f"[*] list page {page}: reached {known_run} known posts in a row, stopping list scan")
+                        break
+                    page += 1
+                if page > MAX_PAGES:
+                    print(f"[*] reached MAX_PAGES={MAX_PAGES}, stopping list scan")
+            finally:
+                for t in prefetch.values():
+                    t.cancel()
+                for _ in range(MAX_CONC):
+                    await post_queue.put(None)
 
-        total = len(all_posts)
-        print(f"[*] Total posts to parse: {total}")
-        async def task(i: int, it: Dict[str,str]):
-            async with sem:
+        async def post_worker():
+            nonlocal done
+            while True:
+                it = await post_queue.get()
+                if it is None:
+                    return
                 try:
-                    return await fetch_post_and_extract(session, it, i, total)
+                    _, rows = await fetch_post_and_extract(session, it, done + 1, discovered)
                 except Exception:
-                    print(f"[-] [{i}/{total}] post: exception {it.get('url')}")
-                    return it.get("url",""), []
-        coros = [task(i+1, it) for i, it in enumerate(all_posts)]
-        base = len(records); done = 0
-        for fut in asyncio.as_completed(coros):
-            _, rows = await fut
-            added = 0
-            for r in rows:
-                key = (r.get("Model",""), r.get("Download",""))
-                if key in seen:
-                    continue
-                seen.add(key)
-                records.append(r)
-                added += 1
-                if (len(records) - base) % SAVE_EVERY == 0:
-                    try:
-                        save_json(OUT_FW, records)
-                        print(f"[*] progress: +{len(records)-base} saved -> {OUT_FW}")
-                    except PermissionError:
-                        time.sleep(0.2)
-                        save_json(OUT_FW, records)
-                        print(f"[*] progress(retry): +{len(records)-base} saved -> {OUT_FW}")
-            done += 1
-            if added:
-                print(f"[+] post added: +{added} (processed {done}/{total})")
-            else:
-                print(f"[*] post added: +0 (processed {done}/{total})")
-            if done % 50 == 0:
-                try:
-                    save_json(OUT_FW, records)
-                    print(f"[*] checkpoint: processed {done}/{total}, total {len(records)} -> {OUT_FW}")
-                except PermissionError:
-                    time.sleep(0.2)
-                    save_json(OUT_FW, records)
-                    print(f"[*] checkpoint(retry): processed {done}/{total}, total {len(records)} -> {OUT_FW}")
+                    print(f"[-] post: exception {it.get('url')}")
+                    rows = None
+                done += 1
+                if rows is not None:
+                    known_posts.add(_post_uid(it["url"]))
+                added = 0
+                for r in rows or []:
+                    key = (r.get("Model",""), r.get("Download",""))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    records.append(r)
+                    added += 1
+                    if (len(records) - base) % SAVE_EVERY == 0:
+                        checkpoint(f"progress: +{len(records)-base} saved")
+                if added:
+                    print(f"[+] post added: +{added} (processed {done}/{discovered})")
+                else:
+                    print(f"[*] post added: +0 (processed {done}/{discovered})")
+                if done % 50 == 0:
+                    checkpoint(f"checkpoint: processed {done}/{discovered}")
+
+        workers = [asyncio.create_task(post_worker()) for _ in range(MAX_CONC)]
+        await list_producer()
+        await asyncio.gather(*workers)
 
-    save_json(OUT_FW, records)
-    print(f"[+] Firmware saved: total {len(records)} -> {OUT_FW}")
+    if not discovered:
+        print("[-] no new posts discovered")
+    checkpoint("Firmware saved")
 
 def main():
-    asyncio.run(harvest_all())
+    asyncio.run(harvest_all("--incremental" in sys.argv[1:]))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,212 @@
+import asyncio
+import os
+import re
+import socket
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from FirmScrap_columnar import load_manifest, save_manifest
+from FirmScrap_record import FirmwareRecord, load_records, save_records
+
+MAX_CONC = 32
+MAX_PER_HOST = 6
+PROBE_TIMEOUT = 20
+MAX_RETRY = 2
+DEAD_AFTER = 2
+PROBE_MAX_AGE = 24 * 3600
+SAVE_EVERY = 200
+# Only answers that say the file is really gone count towards DeadCount; timeouts, resets and 5xx
+# leave it where it was so a flaky sweep cannot get a good link pruned.
+GONE_STATUSES = {404, 410}
+NXDOMAIN_ERRNOS = {socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)}
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+    "Accept": "*/*",
+}
+
+CONTENT_RANGE_RE = re.compile(r"bytes\s+\d+-\d+/(\d+)", re.I)
+
+# Probe results are stored as flat extras on each record so the diff, the columnar export and the
+# download scheduler can read them without knowing about this module:
+#   Status, Length, ContentType, FinalURL, ETag, Probed, Alive, DeadCount, ProbeError
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _age(stamp: Optional[str]) -> float:
+    try:
+        t = datetime.strptime(stamp, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+        return time.time() - t.timestamp()
+    except (TypeError, ValueError):
+        return float("inf")
+
+def _result(r: aiohttp.ClientResponse, length: Optional[int]) -> Dict[str, Any]:
+    ctype = (r.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+    return {
+        "Status": r.status,
+        "Length": length,
+        "ContentType": ctype,
+        "FinalURL": str(r.url),
+        "ETag": r.headers.get("ETag") or "",
+    }
+
+def _is_nxdomain(e: Exception) -> bool:
+    # aiohttp wraps resolver failures; EAI_AGAIN (resolver unreachable) is transient and does not count.
+    err = getattr(e, "os_error", None)
+    return isinstance(err, socket.gaierror) and err.errno in NXDOMAIN_ERRNOS
+
+def _int(v: Optional[str]) -> Optional[int]:
+    try:
+        return int(v) if v is not None else None
+    except ValueError:
+        return None
+
+async def probe_url(session: aiohttp.ClientSession, url: str) -> Dict[str, Any]:
+    timeout = aiohttp.ClientTimeout(total=PROBE_TIMEOUT)
+    last_error = ""
+    for attempt in range(1, MAX_RETRY + 1):
+        try:
+            async with session.head(url, allow_redirects=True, timeout=timeout) as r:
+                head = _result(r, _int(r.headers.get("Content-Length")))
+            if head["Status"] < 400 and head["Length"]:
+                return head
+            # Many download servers refuse HEAD or omit the length on it; a one-byte ranged GET
+            # reports the full size in Content-Range without pulling the body.
+            async with session.get(url, allow_redirects=True, timeout=timeout,
+                                   headers={"Range": "bytes=0-0"}) as r:
+                m = CONTENT_RANGE_RE.search(r.headers.get("Content-Range") or "")
+                length = int(m.group(1)) if m else (None if r.status == 206 else _int(r.headers.get("Content-Length")))
+                return _result(r, length)
+        except Exception as e:
+            if _is_nxdomain(e):
+                last_error = "NXDOMAIN"
+                break
+            last_error = type(e).__name__
+            await asyncio.sleep(min(4, 1.5 ** attempt))
+    return {"Status": 0, "Length": None, "ContentType": "", "FinalURL": "", "ETag": "", "Error": last_error}
+
+def is_alive(res: Dict[str, Any]) -> bool:
+    # An HTML body where a binary is expected is the vendors' usual "file not found" page.
+    if not res.get("Status") or res["Status"] >= 400:
+        return False
+    return res.get("ContentType") != "text/html"
+
+def is_gone(res: Dict[str, Any]) -> bool:
+    return res.get("Status") in GONE_STATUSES or res.get("Error") == "NXDOMAIN"
+
+def apply_probe(rec: FirmwareRecord, res: Dict[str, Any]):
+    extra = rec.extra or {}
+    alive = is_alive(res)
+    extra.update({k: v for k, v in res.items() if k != "Error"})
+    extra["Probed"] = _now()
+    extra["Alive"] = alive
+    if alive:
+        extra["DeadCount"] = 0
+    elif is_gone(res):
+        extra["DeadCount"] = int(extra.get("DeadCount") or 0) + 1
+    else:
+        extra.setdefault("DeadCount", 0)
+    if res.get("Error"):
+        extra["ProbeError"] = res["Error"]
+    else:
+        extra.pop("ProbeError", None)
+    rec.extra = extra
+
+def _due(rec: FirmwareRecord, max_age: float) -> bool:
+    url = rec.download
+    if not url or urlparse(url).scheme not in ("http", "https"):
+        return False
+    return _age((rec.extra or {}).get("Probed")) >= max_age
+
+async def probe_records(records: List[FirmwareRecord], max_age: float = 0,
+                        checkpoint=None) -> int:
+    # Several rows often share a URL (same image listed under two models); each URL is probed once.
+    by_url: Dict[str, List[FirmwareRecord]] = {}
+    for rec in records:
+        if _due(rec, max_age):
+            by_url.setdefault(rec.download, []).append(rec)
+    total = len(by_url)
+    print(f"[*] Probing {total} URLs ({len(records)} records)")
+    if not total:
+        return 0
+    sem = asyncio.Semaphore(MAX_CONC)
+    connector = aiohttp.TCPConnector(limit=MAX_CONC, limit_per_host=MAX_PER_HOST)
+    async with aiohttp.ClientSession(headers=HEADERS, connector=connector) as session:
+        async def task(url: str):
+            async with sem:
+                return url, await probe_url(session, url)
+        done = 0
+        dead = 0
+        gone = 0
+        for fut in asyncio.as_completed([task(u) for u in by_url]):
+            url, res = await fut
+            for rec in by_url[url]:
+                apply_probe(rec, res)
+            done += 1
+            if not is_alive(res):
+                dead += 1
+                gone += is_gone(res)
+                print(f"[-] [{done}/{total}] {res['Status'] or res.get('Error')} {url}")
+            if checkpoint and done % SAVE_EVERY == 0:
+                checkpoint()
+    print(f"[+] Probed {total} URLs: {total - dead} alive, {dead} not alive ({gone} gone, {dead - gone} unreachable or not a file)")
+    return total
+
+def prune_dead(records: List[FirmwareRecord], dead_after: int = DEAD_AFTER):
+    keep, dead = [], []
+    for rec in records:
+        if int((rec.extra or {}).get("DeadCount") or 0) >= dead_after:
+            dead.append(rec)
+        else:
+            keep.append(rec)
+    return keep, dead
+
+def _opt(args: List[str], name: str, default=None):
+    if name in args:
+        i = args.index(name)
+        if i + 1 < len(args):
+            return args[i + 1]
+    return default
+
+def run_once(path: str, out_path: str, prune: bool, max_age: float):
+    records = load_manifest(path)
+    asyncio.run(probe_records(records, max_age, lambda: save_manifest(out_path, records)))
+    if prune:
+        records, dead = prune_dead(records)
+        if dead:
+            dead_path = f"{out_path}.dead.json"
+            save_records(dead_path, load_records(dead_path) + dead)
+            print(f"[*] Pruned {len(dead)} links dead for {DEAD_AFTER}+ sweeps -> {dead_path}")
+    save_manifest(out_path, records)
+    print(f"[+] Probe results saved -> {out_path}")
+
+def main():
+    # python FirmScrap_link_probe.py <manifest> [--out probed.json] [--sweep HOURS] [--prune] [--max-age SECONDS]
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
+        print("usage: python FirmScrap_link_probe.py <manifest> [--out probed.json] [--sweep HOURS] [--prune] [--max-age SECONDS]")
+        return
+    path = args[0]
+    out_path = _opt(args, "--out", path)
+    prune = "--prune" in args
+    sweep = _opt(args, "--sweep")
+    if not sweep:
+        run_once(path, out_path, prune, float(_opt(args, "--max-age", 0)))
+        return
+    # Sweep mode: re-probe links older than PROBE_MAX_AGE every SWEEP hours, pruning repeat offenders.
+    interval = float(sweep) * 3600
+    max_age = float(_opt(args, "--max-age", PROBE_MAX_AGE))
+    while True:
+        run_once(out_path if os.path.exists(out_path) else path, out_path, prune, max_age)
+        print(f"[*] Next sweep in {sweep}h")
+        time.sleep(interval)
+
+if __name__ == "__main__":
+    main()
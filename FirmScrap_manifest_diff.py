@@ -0,0 +1,150 @@
+import json
+import os
+import posixpath
+import sys
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import FirmScrap_columnar as columnar
+from FirmScrap_record import FirmwareRecord, load_records, merge_records, save_records
+
+# Two snapshots of the same manifest are joined in passes, each one a dict build plus a probe, so
+# the whole diff is O(n):
+#   1. (vendor, model, download)   same image; changed if version/size/release moved
+#   2. (vendor, model, version)    same release re-hosted under a new URL
+#   3. (vendor, model, file name)  same file moved to another host/path
+# Whatever is still unmatched on either side is added or removed.
+COMPARED_FIELDS = ("version", "download", "release")
+DOWNLOAD_FIELDS = {"download", "size"}
+# Where a size can come from: the vendor's own label and the HEAD probe's Content-Length. They are in
+# different units and not every snapshot is probed, so a size only counts as changed when both sides
+# carry it from the same source.
+SIZE_SOURCES = ("Size", "Length")
+
+def _size_changed(old: FirmwareRecord, new: FirmwareRecord) -> bool:
+    for key in SIZE_SOURCES:
+        a = (old.extra or {}).get(key)
+        b = (new.extra or {}).get(key)
+        if a not in (None, "") and b not in (None, "") and str(a) != str(b):
+            return True
+    return False
+
+def changed_fields(old: FirmwareRecord, new: FirmwareRecord) -> List[str]:
+    fields = [f for f in COMPARED_FIELDS if getattr(old, f) != getattr(new, f)]
+    if _size_changed(old, new):
+        fields.append("size")
+    return fields
+
+def _file_name(url: str) -> str:
+    try:
+        return posixpath.basename(urlparse(url).path).lower()
+    except Exception:
+        return ""
+
+def _key_exact(r: FirmwareRecord):
+    return (r.vendor, r.model, r.download or r.release_notes)
+
+def _key_version(r: FirmwareRecord):
+    return (r.vendor, r.model, r.version) if r.version else None
+
+def _key_file(r: FirmwareRecord):
+    name = _file_name(r.download)
+    return (r.vendor, r.model, name) if name else None
+
+JOIN_PASSES = (_key_exact, _key_version, _key_file)
+
+def load_snapshot(path: str) -> List[FirmwareRecord]:
+    if not os.path.exists(path):
+        return []
+    if columnar.is_columnar_path(path):
+        return columnar.load_records(path)
+    return merge_records([load_records(path)])
+
+def diff_records(old: List[FirmwareRecord], new: List[FirmwareRecord]) -> Dict[str, list]:
+    old_left = list(old)
+    new_left = list(new)
+    changed: List[Tuple[FirmwareRecord, FirmwareRecord, List[str]]] = []
+    unchanged = 0
+    for key_fn in JOIN_PASSES:
+        index: Dict[tuple, FirmwareRecord] = {}
+        rest_old = []
+        for r in old_left:
+            k = key_fn(r)
+            if k is None or k in index:
+                rest_old.append(r)
+            else:
+                index[k] = r
+        rest_new = []
+        for r in new_left:
+            k = key_fn(r)
+            o = index.pop(k, None) if k is not None else None
+            if o is None:
+                rest_new.append(r)
+                continue
+            fields = changed_fields(o, r)
+            if fields:
+                changed.append((o, r, fields))
+            else:
+                unchanged += 1
+        old_left = rest_old + list(index.values())
+        new_left = rest_new
+    return {"added": new_left, "removed": old_left, "changed": changed, "unchanged": unchanged}
+
+def delta_records(diff: Dict[str, list]) -> List[FirmwareRecord]:
+    # Only rows that point at bytes we do not have yet: new images and images whose URL or size moved.
+    out = []
+    for r in diff["added"]:
+        out.append(_tag(r, "added"))
+    for _, r, fields in diff["changed"]:
+        if DOWNLOAD_FIELDS.intersection(fields):
+            out.append(_tag(r, "changed", fields))
+    return out
+
+def _tag(r: FirmwareRecord, change: str, fields: Optional[List[str]] = None) -> FirmwareRecord:
+    extra = dict(r.extra or {})
+    extra["Change"] = change
+    if fields:
+        extra["ChangedFields"] = fields
+    return FirmwareRecord(r.vendor, r.model, r.download, r.version, r.release, r.release_notes, extra)
+
+def write_report(path: str, diff: Dict[str, list]):
+    report = {
+        "added": [r.to_dict() for r in diff["added"]],
+        "removed": [r.to_dict() for r in diff["removed"]],
+        "changed": [{"old": o.to_dict(), "new": n.to_dict(), "fields": f} for o, n, f in diff["changed"]],
+        "unchanged": diff["unchanged"],
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def main():
+    args = list(sys.argv[1:])
+    report_path = None
+    if "--report" in args:
+        i = args.index("--report")
+        report_path = args[i + 1] if i + 1 < len(args) else None
+        del args[i:i + 2]
+    if len(args) != 3:
+        print("usage: python FirmScrap_manifest_diff.py <old manifest> <new manifest> <delta out> [--report report.json]")
+        return
+    old_path, new_path, delta_path = args
+    old = load_snapshot(old_path)
+    new = load_snapshot(new_path)
+    print(f"[*] old: {len(old)} records, new: {len(new)} records")
+    diff = diff_records(old, new)
+    print(f"[+] added {len(diff['added'])}, removed {len(diff['removed'])}, "
+          f"changed {len(diff['changed'])}, unchanged {diff['unchanged']}")
+    delta = delta_records(diff)
+    if columnar.is_columnar_path(delta_path):
+        columnar.export_records(delta, delta_path)
+    else:
+        save_records(delta_path, delta)
+    print(f"[+] Delta manifest: {len(delta)} records to download -> {delta_path}")
+    if report_path:
+        write_report(report_path, diff)
+        print(f"[+] Report -> {report_path}")
+
+if __name__ == "__main__":
+    main()
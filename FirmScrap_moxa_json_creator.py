@@ -4,17 +4,29 @@ from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 from urllib.parse import urljoin
+from FirmScrap_moxa_psid_index import load_psid_index, psid_name
+from FirmScrap_record import FirmwareRecord, load_rows
+from FirmScrap_negative_cache import load_negative_cache, save_negative_cache, negative_reason, mark_negative, clear_negative
 import json
-import time
 import os
+import queue
+import threading
 
 HTML_FILE = "moxa_psid.html"
 BASE_URL = "https://www.moxa.com/en/support/product-support/software-and-documentation/search?psid={}"
 CONCURRENT_REQUESTS = 20
+SELENIUM_WORKERS = 4
+SELENIUM_PAGE_TIMEOUT = 15
+DOWNLOADS_TABLE_CELLS = "#firmware-software-driver td.border-table__td"
 SAVE_INTERVAL = 5
 RESULT_FILE = "moxa_firmware_links.json"
+NOTES_FILE = "moxa_release_notes_only.json"
+VENDOR = "MOXA"
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
@@ -23,36 +35,77 @@ HEADERS = {
     "Referer": "https://www.moxa.com"
 }
 
-results = []
 retry_psids = []
 sem = asyncio.Semaphore(CONCURRENT_REQUESTS)
+results_lock = threading.Lock()
 
-if os.path.exists(RESULT_FILE):
-    with open(RESULT_FILE, "r", encoding="utf-8") as f:
-        try:
-            results = json.load(f)
-        except json.JSONDecodeError:
-            results = []
+# Requests the Selenium workers never need: the psid pages are only read for their downloads table.
+BLOCKED_URL_PATTERNS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico",
+                        "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"]
+
+psid_index = load_psid_index(HTML_FILE) if os.path.exists(HTML_FILE) else {}
+psid_names = {p: psid_name(psid_index, p) for p in psid_index}
+results = load_rows(RESULT_FILE, VENDOR, psid_names)
+release_notes = load_rows(NOTES_FILE, VENDOR, psid_names)
+seen_links = {(r.get("Psid"), r.get("Download")) for r in results}
+seen_notes = {(r.get("Psid"), r.get("ReleaseNotes")) for r in release_notes}
+negative = load_negative_cache(VENDOR)
 
 def save_results():
     with open(RESULT_FILE, "w", encoding="utf-8") as f:
         json.dump(results, f, indent=4, ensure_ascii=False)
-    print(f"[*] Saved: {len(results)} links")
+    with open(NOTES_FILE, "w", encoding="utf-8") as f:
+        json.dump(release_notes, f, indent=4, ensure_ascii=False)
+    print(f"[*] Saved: {len(results)} links, {len(release_notes)} release notes")
 
-def extract_psids_from_html_file(html_file_path):
-    with open(html_file_path, "r", encoding="utf-8") as file:
-        html_content = file.read()
-    soup = BeautifulSoup(html_content, "html.parser")
-    psid_set = set()
+def parse_psid_page(html, psid):
+    # Firmware rows and release-note PDFs live on the same psid page, so both come out of one parse.
+    soup = BeautifulSoup(html, "html.parser")
+    firmware = []
+    for table in soup.find_all("table"):
+        for row in table.find_all("tr")[1:]:
+            cols = row.find_all("td")
+            if len(cols) >= 2 and "firmware" in cols[1].text.strip().lower():
+                a_tag = cols[0].find("a", href=True)
+                if a_tag:
+                    firmware.append(FirmwareRecord(
+                        vendor=VENDOR,
+                        model=psid_names.get(psid) or f"psid={psid}",
+                        download=urljoin("https://www.moxa.com", a_tag['href']),
+                        extra={"Psid": psid},
+                    ).to_dict())
+    notes = []
     for a in soup.find_all("a", href=True):
         href = a["href"]
-        if "psid=" in href:
-            try:
-                psid = int(href.split("psid=")[1].split("&")[0])
-                psid_set.add(psid)
-            except ValueError:
-                continue
-    return sorted(psid_set)
+        text = a.get_text(strip=True).lower()
+        if "release note" in text and href.lower().endswith(".pdf") and "firmware" in href.lower():
+            notes.append(FirmwareRecord(
+                vendor=VENDOR,
+                model=psid_names.get(psid) or f"psid={psid}",
+                release_notes=urljoin("https://www.moxa.com", href),
+                extra={"Psid": psid},
+            ).to_dict())
+    return firmware, notes
+
+def record_page(html, psid):
+    return record_rows(*parse_psid_page(html, psid))
+
+def record_rows(firmware, notes):
+    for r in firmware:
+        key = (r.get("Psid"), r.get("Download"))
+        if key in seen_links:
+            continue
+        seen_links.add(key)
+        results.append(r)
+        if len(results) % SAVE_INTERVAL == 0:
+            save_results()
+    for r in notes:
+        key = (r.get("Psid"), r.get("ReleaseNotes"))
+        if key in seen_notes:
+            continue
+        seen_notes.add(key)
+        release_notes.append(r)
+    return bool(firmware), bool(notes)
 
 async def fetch_and_parse(session, psid):
     url = BASE_URL.format(psid)
@@ -61,23 +114,10 @@ async def fetch_and_parse(session, psid):
             async with session.get(url, headers=HEADERS, timeout=10) as response:
                 if response.status == 200:
                     html = await response.text()
-                    soup = BeautifulSoup(html, "html.parser")
-                    found_firmware = False
-                    for table in soup.find_all("table"):
-                        for row in table.find_all("tr")[1:]:
-                            cols = row.find_all("td")
-                            if len(cols) >= 2 and "firmware" in cols[1].text.strip().lower():
-                                a_tag = cols[0].find("a", href=True)
-                                if a_tag:
-                                    results.append({
-                                        "Vendor": f"psid={psid}",
-                                        "Download": urljoin("https://www.moxa.com", a_tag['href'])
-                                    })
-                                    found_firmware = True
-                                    if len(results) % SAVE_INTERVAL == 0:
-                                        save_results()
+                    found_firmware, found_notes = record_page(html, psid)
                     if found_firmware:
-                        print(f"[aiohttp] psid={psid} firmware found!")
+                        clear_negative(negative, VENDOR, psid)
+                        print(f"[aiohttp] psid={psid} firmware found!" + (" (+release note)" if found_notes else ""))
                     else:
                         retry_psids.append(psid)
                         print(f"[retry] psid={psid} firmware not found.. Scheduled to be attemped Selenium")
@@ -88,49 +128,99 @@ async def fetch_and_parse(session, psid):
             retry_psids.append(psid)
             print(f"[retry] psid={psid} request failed: {e}")
 
-def selenium_retry(psid_list):
+def setup_driver(driver_path):
     options = Options()
     options.add_argument('--headless')
     options.add_argument('--disable-gpu')
     options.add_argument('--no-sandbox')
     options.add_argument('--window-size=1920,1080')
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    options.add_argument('--blink-settings=imagesEnabled=false')
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.stylesheets": 2,
+        "profile.managed_default_content_settings.fonts": 2,
+    })
+    options.page_load_strategy = "eager"
+    driver = webdriver.Chrome(service=Service(driver_path), options=options)
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    except Exception:
+        pass
+    return driver
 
-    for psid in psid_list:
-        if any(f"psid={psid}" in r["Vendor"] for r in results):
-            print(f"[SKIP] selenium psid={psid} already processed")
-            continue
+def downloads_table_ready(driver):
+    # Data cells of the "Software, Firmware and Drivers" table; the header row and the support documents
+    # table render earlier, so matching any table cell would fire before the downloads are in.
+    return len(driver.find_elements(By.CSS_SELECTOR, DOWNLOADS_TABLE_CELLS)) >= 2
 
-        url = BASE_URL.format(psid)
-        try:
-            driver.get(url)
-            time.sleep(3)
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            found_firmware = False
-            for table in soup.find_all("table"):
-                for row in table.find_all("tr")[1:]:
-                    cols = row.find_all("td")
-                    if len(cols) >= 2 and "firmware" in cols[1].text.strip().lower():
-                        a_tag = cols[0].find("a", href=True)
-                        if a_tag:
-                            results.append({
-                                "Vendor": f"psid={psid}",
-                                "Download": urljoin("https://www.moxa.com", a_tag['href'])
-                            })
-                            found_firmware = True
-                            if len(results) % SAVE_INTERVAL == 0:
-                                save_results()
-            if found_firmware:
-                print(f"[selenium] psid={psid} firmware found!")
-            else:
-                print(f"[-] selenium failed: psid={psid} firmware not found..")
-        except Exception as e:
-            print(f"[!] selenium error: psid={psid} → {e}")
-    driver.quit()
+def selenium_worker(worker_id, driver_path, work, processed):
+    try:
+        driver = setup_driver(driver_path)
+    except Exception as e:
+        print(f"[!] selenium worker {worker_id} failed to start: {e}")
+        return
+    try:
+        while True:
+            try:
+                psid = work.get_nowait()
+            except queue.Empty:
+                return
+            if psid in processed:
+                print(f"[SKIP] selenium psid={psid} already processed")
+                continue
+
+            url = BASE_URL.format(psid)
+            try:
+                driver.get(url)
+                try:
+                    WebDriverWait(driver, SELENIUM_PAGE_TIMEOUT).until(downloads_table_ready)
+                    loaded = True
+                except TimeoutException:
+                    loaded = False
+                firmware, notes = parse_psid_page(driver.page_source, psid)
+                with results_lock:
+                    found_firmware, found_notes = record_rows(firmware, notes)
+                    if found_firmware:
+                        processed.add(psid)
+                        clear_negative(negative, VENDOR, psid)
+                    elif loaded:
+                        # Only a downloads table that rendered rows, none of them firmware, is cached; a timeout
+                        # may be a slow or blocked load, or a page without downloads, and is retried next run.
+                        mark_negative(negative, VENDOR, psid, "no firmware in downloads table")
+                if found_firmware:
+                    print(f"[selenium-{worker_id}] psid={psid} firmware found!" + (" (+release note)" if found_notes else ""))
+                elif loaded:
+                    print(f"[-] selenium failed: psid={psid} firmware not found..")
+                else:
+                    print(f"[-] selenium timeout: psid={psid} downloads table never loaded, not cached")
+            except Exception as e:
+                print(f"[!] selenium error: psid={psid} → {e}")
+    finally:
+        driver.quit()
+
+def selenium_retry(psid_list):
+    processed = {r.get("Psid") for r in results}
+    work = queue.Queue()
+    for psid in psid_list:
+        work.put(psid)
+    driver_path = ChromeDriverManager().install()
+    workers = [
+        threading.Thread(target=selenium_worker, args=(i, driver_path, work, processed), daemon=True)
+        for i in range(1, min(SELENIUM_WORKERS, len(psid_list)) + 1)
+    ]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
 
 async def main():
-    psid_list = extract_psids_from_html_file(HTML_FILE)
+    psid_list = sorted(psid_index)
     print(f"[+] Total {len(psid_list)} psid are extracted")
+    skipped = [p for p in psid_list if negative_reason(negative, VENDOR, p)]
+    if skipped:
+        print(f"[*] Skipping {len(skipped)} psids cached as negative")
+        psid_list = [p for p in psid_list if not negative_reason(negative, VENDOR, p)]
 
     async with aiohttp.ClientSession() as session:
         tasks = [fetch_and_parse(session, psid) for psid in psid_list]
@@ -141,7 +231,8 @@ async def main():
         selenium_retry(retry_psids)
 
     save_results()
-    print(f"\n[+] Done! {len(results)} links are saved.")
+    save_negative_cache(VENDOR, negative)
+    print(f"\n[+] Done! {len(results)} links and {len(release_notes)} release notes are saved.")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import re
+from html import unescape
+from typing import Any, Dict, List
+
+PSID_CACHE_FILE = "moxa_psid_index.json"
+
+ANCHOR_RE = re.compile(r"""<a\b[^>]*?\bhref\s*=\s*(["'])([^"']*?psid=[^"']*)\1[^>]*>(.*?)</a>""", re.I | re.S)
+PSID_RE = re.compile(r"psid=([^&#\"']*)")
+TAG_RE = re.compile(r"<[^>]+>")
+WS_RE = re.compile(r"\s+")
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def scan_psids(html: str) -> Dict[int, Dict[str, str]]:
+    # One regex pass over the saved product list; keeps the first link text seen for each psid.
+    meta: Dict[int, Dict[str, str]] = {}
+    for m in ANCHOR_RE.finditer(html):
+        pm = PSID_RE.search(m.group(2))
+        if not pm:
+            continue
+        try:
+            psid = int(pm.group(1))
+        except ValueError:
+            continue
+        name = WS_RE.sub(" ", unescape(TAG_RE.sub(" ", m.group(3)))).strip()
+        if psid not in meta or (name and not meta[psid]["Name"]):
+            meta[psid] = {"Name": name}
+    return meta
+
+def load_psid_index(html_file_path: str, cache_path: str = PSID_CACHE_FILE) -> Dict[int, Dict[str, str]]:
+    st = os.stat(html_file_path)
+    cache: Dict[str, Any] = {}
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except Exception:
+            cache = {}
+
+    def from_cache():
+        return {int(k): v for k, v in (cache.get("meta") or {}).items()}
+
+    if cache.get("mtime") == st.st_mtime_ns and cache.get("size") == st.st_size:
+        return from_cache()
+
+    digest = _file_sha256(html_file_path)
+    if cache.get("sha256") == digest:
+        meta = from_cache()
+    else:
+        with open(html_file_path, "r", encoding="utf-8") as f:
+            meta = scan_psids(f.read())
+
+    tmp = f"{cache_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "source": os.path.basename(html_file_path),
+            "mtime": st.st_mtime_ns,
+            "size": st.st_size,
+            "sha256": digest,
+            "psids": sorted(meta),
+            "meta": {str(k): meta[k] for k in sorted(meta)},
+        }, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, cache_path)
+    return meta
+
+def load_psids(html_file_path: str, cache_path: str = PSID_CACHE_FILE) -> List[int]:
+    return sorted(load_psid_index(html_file_path, cache_path))
+
+def psid_name(index: Dict[int, Dict[str, str]], psid: int) -> str:
+    return (index.get(psid) or {}).get("Name", "")
@@ -0,0 +1,55 @@
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+NEGATIVE_CACHE_FILE = "negative_cache.json"
+# Used by every creator; negative answers are re-checked after two weeks.
+DEFAULT_TTL = 14 * 24 * 3600
+
+# {"<vendor>:<key>": {"reason": "...", "ts": <epoch>, "ttl": <seconds>}}
+# Shared by every creator; each creator only rewrites its own vendor's entries on save.
+
+def _cache_key(vendor: str, key: Any) -> str:
+    return f"{vendor.lower()}:{key}"
+
+def _read(path: str) -> Dict[str, Dict[str, Any]]:
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+    return {}
+
+def _expired(entry: Dict[str, Any], now: float) -> bool:
+    ttl = entry.get("ttl")
+    return now - float(entry.get("ts") or 0) >= float(DEFAULT_TTL if ttl is None else ttl)
+
+def load_negative_cache(vendor: str, path: str = NEGATIVE_CACHE_FILE) -> Dict[str, Dict[str, Any]]:
+    prefix = _cache_key(vendor, "")
+    now = time.time()
+    return {k: v for k, v in _read(path).items() if k.startswith(prefix) and not _expired(v, now)}
+
+def save_negative_cache(vendor: str, cache: Dict[str, Dict[str, Any]], path: str = NEGATIVE_CACHE_FILE) -> None:
+    prefix = _cache_key(vendor, "")
+    now = time.time()
+    merged = {k: v for k, v in _read(path).items() if not k.startswith(prefix) and not _expired(v, now)}
+    merged.update({k: v for k, v in cache.items() if not _expired(v, now)})
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(merged.items())), f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def negative_reason(cache: Dict[str, Dict[str, Any]], vendor: str, key: Any) -> Optional[str]:
+    entry = cache.get(_cache_key(vendor, key))
+    if not entry or _expired(entry, time.time()):
+        return None
+    return entry.get("reason") or "negative"
+
+def mark_negative(cache: Dict[str, Dict[str, Any]], vendor: str, key: Any, reason: str, ttl: float = DEFAULT_TTL) -> None:
+    cache[_cache_key(vendor, key)] = {"reason": reason, "ts": int(time.time()), "ttl": int(ttl)}
+
+def clear_negative(cache: Dict[str, Dict[str, Any]], vendor: str, key: Any) -> None:
+    cache.pop(_cache_key(vendor, key), None)
@@ -1,12 +1,24 @@
 import asyncio, aiohttp, json, os, re, sys, tempfile, random, time
-from typing import Any, Dict, List, Set, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 from urllib.parse import urlparse
+from FirmScrap_record import FirmwareRecord, load_rows
 
 BASE = "https://www.netgear.com"
 API_SEARCH = BASE + "/api/v2/getsearchjson/?componentId={cid}&publicationId={pub}"
 API_DETAILS = BASE + "/api/v2/product/getproductdetails/?componentId={cid}&publicationId={pub}"
 OUT_MODELS = "netgear_all_models.json"
 OUT_FW = "netgear_firmware_links.json"
+OUT_PUB_STATS = "netgear_pub_stats.json"
+VENDOR = "NETGEAR"
+SEARCH_PAYLOAD_DIR = "netgear_search_payloads"
+# getsearchjson component ids whose product lists are merged. Only one is known so far, so the list fetch is a
+# single request; the concurrent fetch in get_all_models pays off once more are added (or passed with
+# --components 52117,12345).
+COMPONENT_IDS = [52117]
+MAX_CONC_COMPONENTS = 8
+
+DEFAULT_PUBS = [11, 122, 1]
+HEDGE_DELAY = 3.0
 
 UA = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36",
@@ -72,6 +84,29 @@ async def _fetch_json(session: aiohttp.ClientSession, url: str, max_retry=4):
             await asyncio.sleep(min(10, backoff**attempt))
     return None
 
+_JSON_DECODER = json.JSONDecoder()
+_JSON_OPEN_RE = re.compile(r"[\[{]")
+
+def _scan_content_items(s: str) -> List[Any]:
+    # Single forward pass: decode each top-level JSON value in place and continue after it,
+    # skipping any non-JSON text between values, so no part of the string is parsed twice.
+    items: List[Any] = []
+    if not s:
+        return items
+    idx = 0
+    while True:
+        m = _JSON_OPEN_RE.search(s, idx)
+        if not m: break
+        try:
+            obj, idx = _JSON_DECODER.raw_decode(s, m.start())
+        except ValueError:
+            idx = m.start() + 1
+            continue
+        if isinstance(obj, list): items.extend(obj)
+        else: items.append(obj)
+    return items
+
+# Previous multi-strategy extractor; only used as the reference in `bench`.
 def _extract_items_from_content_string(s: str):
     s = (s or "").strip()
     items = []
@@ -122,12 +157,19 @@ def _parse_component_id(tcm: str) -> int:
     m = re.search(r'tcm:\d+-(\d+)', tcm)
     return int(m.group(1)) if m else 0
 
-async def get_all_models(session: aiohttp.ClientSession, component_ids: List[int], publication_id: int = 11) -> List[Dict[str, str]]:
+async def get_all_models(session: aiohttp.ClientSession, component_ids: List[int], publication_id: int = 11, record: bool = False) -> List[Dict[str, str]]:
     seen: Set[str] = set()
     rows: List[Dict[str, str]] = []
-    for cid in component_ids:
-        url = API_SEARCH.format(cid=cid, pub=publication_id)
-        data = await _fetch_json(session, url)
+    sem = asyncio.Semaphore(MAX_CONC_COMPONENTS)
+    async def fetch(cid: int):
+        async with sem:
+            data = await _fetch_json(session, API_SEARCH.format(cid=cid, pub=publication_id))
+        if data and record:
+            os.makedirs(SEARCH_PAYLOAD_DIR, exist_ok=True)
+            save_json(os.path.join(SEARCH_PAYLOAD_DIR, f"component_{cid}_pub_{publication_id}.json"), data)
+        return data
+    payloads = await asyncio.gather(*(fetch(cid) for cid in component_ids))
+    for cid, data in zip(component_ids, payloads):
         if not data:
             print(f"[-] componentId={cid} no data")
             continue
@@ -137,9 +179,8 @@ async def get_all_models(session: aiohttp.ClientSession, component_ids: List[int
             continue
         added_total = 0
         for s in candidates:
-            arr = _extract_items_from_content_string(s)
             added = 0
-            for item in arr if isinstance(arr, list) else []:
+            for item in _scan_content_items(s):
                 if not isinstance(item, dict): continue
                 model = (item.get("model") or "").strip()
                 title = (item.get("title") or "").strip()
@@ -151,7 +192,7 @@ async def get_all_models(session: aiohttp.ClientSession, component_ids: List[int
                 if key in seen: continue
                 seen.add(key)
                 rows.append({
-                    "Vendor": "NETGEAR",
+                    "Vendor": VENDOR,
                     "Model": model,
                     "Title": title,
                     "ProductURL": url2,
@@ -201,49 +242,130 @@ def _extract_fw_from_downloadmap(download_map: dict, model: str) -> List[Dict]:
             ver = ""
             m = re.search(r'(?i)\b(v?\d+(?:\.\d+)+)\b', title) or re.search(r'(?i)\b(v?\d+(?:\.\d+)+)\b', os.path.basename(url))
             if m: ver = m.group(1).lstrip('vV')
-            out.append({
-                "Vendor": "NETGEAR",
-                "Model": model.upper(),
-                "Version": ver,
-                "Download": url,
-                "Section": section,
-                "Title": title,
-                "Size": size,
-                "ReleaseNotes": rel
-            })
+            out.append(FirmwareRecord(
+                vendor=VENDOR,
+                model=model.upper(),
+                version=ver,
+                download=url,
+                release_notes=rel,
+                extra={"Section": section, "Title": title, "Size": size},
+            ).to_dict())
     pull("latest"); pull("older")
     return out
 
-async def fetch_firmware_by_component(session: aiohttp.ClientSession, model: str, component_id: int, idx: int, total: int) -> Tuple[str, List[Dict]]:
+def _model_family(model: str) -> str:
+    m = re.match(r"[A-Za-z]+", (model or "").strip())
+    return m.group(0).upper() if m else ""
+
+def load_pub_stats() -> Dict[str, Any]:
+    # {"models": {MODEL: winning pub}, "families": {FAMILY: {pub: [hits, tries]}}, "global": {pub: [hits, tries]}}
+    data = load_json(OUT_PUB_STATS)
+    if not isinstance(data, dict): data = {}
+    for k in ("models", "families", "global"):
+        if not isinstance(data.get(k), dict): data[k] = {}
+    return data
+
+def _pub_order(stats: Dict[str, Any], model: str) -> List[int]:
+    known = stats["models"].get(model.upper())
+    fam = stats["families"].get(_model_family(model)) or {}
+    glob = stats["global"]
+    def rate(tbl: Dict[str, List[int]], pub: int) -> float:
+        hits, tries = tbl.get(str(pub)) or [0, 0]
+        return (hits + 1) / (tries + 2)
+    return sorted(DEFAULT_PUBS, key=lambda p: (p != known, -rate(fam, p), -rate(glob, p), DEFAULT_PUBS.index(p)))
+
+def _record_pub(stats: Dict[str, Any], model: str, completed: List[int], winner: int):
+    fam = stats["families"].setdefault(_model_family(model), {})
+    for tbl in (fam, stats["global"]):
+        for pub in completed:
+            cell = tbl.setdefault(str(pub), [0, 0])
+            cell[1] += 1
+            if pub == winner: cell[0] += 1
+    if winner:
+        stats["models"][model.upper()] = winner
+
+async def _lookup_pub(session: aiohttp.ClientSession, model: str, component_id: int, pub: int, idx: int, total: int) -> List[Dict]:
+    url = API_DETAILS.format(cid=component_id, pub=pub)
+    print(f"[*] [{idx}/{total}] {model}: getproductdetails cid={component_id} pub={pub}")
+    data = await _fetch_json(session, url, max_retry=4)
+    if not data:
+        print(f"[-] [{idx}/{total}] {model}: fetch failed for pub={pub}")
+        return []
+    download_map = ((((data.get("data") or {}).get("typedComponent") or {}).get("downloadMap") or {}))
+    items = _extract_fw_from_downloadmap(download_map, model)
+    if not items:
+        print(f"[*] [{idx}/{total}] {model}: no allowed firmware in pub={pub}")
+        return []
+    versions_vals = (((((data.get("data") or {}).get("typedComponent") or {}).get("content") or {}).get("data") or {}).get("versions") or {}).get("$values") or []
+    versions = [ (v or {}).get("mversion","").strip() for v in versions_vals if isinstance(v, dict) ]
+    if versions:
+        for it in items: it["HWRevisions"] = versions
+    return items
+
+async def fetch_firmware_by_component(session: aiohttp.ClientSession, model: str, component_id: int, idx: int, total: int, stats: Dict[str, Any] = None) -> Tuple[str, List[Dict]]:
     if not component_id:
         print(f"[-] [{idx}/{total}] {model}: missing component id")
         return model, []
-    pubs = [11, 122, 1]
-    for pub in pubs:
-        url = API_DETAILS.format(cid=component_id, pub=pub)
-        print(f"[*] [{idx}/{total}] {model}: getproductdetails cid={component_id} pub={pub}")
-        data = await _fetch_json(session, url, max_retry=4)
-        if not data:
-            print(f"[-] [{idx}/{total}] {model}: fetch failed for pub={pub}")
-            continue
-        download_map = ((((data.get("data") or {}).get("typedComponent") or {}).get("downloadMap") or {}))
-        items = _extract_fw_from_downloadmap(download_map, model)
-        if items:
-            versions_vals = (((((data.get("data") or {}).get("typedComponent") or {}).get("content") or {}).get("data") or {}).get("versions") or {}).get("$values") or []
-            versions = [ (v or {}).get("mversion","").strip() for v in versions_vals if isinstance(v, dict) ]
-            if versions:
-                for it in items: it["HWRevisions"] = versions
-            print(f"[+] [{idx}/{total}] {model}: {len(items)} firmware entries (pub={pub})")
-            return model, items
+    # Ask the most likely publication first; if it has not answered within HEDGE_DELAY,
+    # race the next one alongside it. The first publication with firmware wins, the rest are cancelled.
+    order = _pub_order(stats, model) if stats is not None else list(DEFAULT_PUBS)
+    running: Dict[asyncio.Task, int] = {}
+    completed: List[int] = []
+    winner, items, launched = 0, [], 0
+    def launch():
+        nonlocal launched
+        pub = order[launched]; launched += 1
+        running[asyncio.create_task(_lookup_pub(session, model, component_id, pub, idx, total))] = pub
+    launch()
+    try:
+        while running:
+            timeout = HEDGE_DELAY if launched < len(order) else None
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                print(f"[*] [{idx}/{total}] {model}: pub={list(running.values())} slow, hedging with pub={order[launched]}")
+                launch(); continue
+            for t in done:
+                pub = running.pop(t)
+                completed.append(pub)
+                res = t.result()
+                if res and not winner:
+                    winner, items = pub, res
+            if winner: break
+            if launched < len(order): launch()
+    finally:
+        for t in running: t.cancel()
+        if running: await asyncio.gather(*running, return_exceptions=True)
+    if stats is not None:
+        _record_pub(stats, model, completed, winner)
+    if winner:
+        print(f"[+] [{idx}/{total}] {model}: {len(items)} firmware entries (pub={winner})")
+    return model, items
+
+def bench(paths: List[str], rounds: int = 5):
+    if not paths and os.path.isdir(SEARCH_PAYLOAD_DIR):
+        paths = sorted(os.path.join(SEARCH_PAYLOAD_DIR, p) for p in os.listdir(SEARCH_PAYLOAD_DIR) if p.endswith(".json"))
+    if not paths:
+        print("[-] No recorded getsearchjson payloads; run with --record first or pass payload files")
+        return
+    for path in paths:
+        candidates = list(_iter_candidate_json_strings(load_json(path)))
+        size = sum(len(c) for c in candidates) or 1
+        timings = {}
+        outputs = {}
+        for name, fn in (("legacy", _extract_items_from_content_string), ("scanner", _scan_content_items)):
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                outputs[name] = [it for c in candidates for it in fn(c)]
+            timings[name] = (time.perf_counter() - t0) / rounds
+            print(f"[*] {os.path.basename(path)} {name:>7}: {len(outputs[name])} items, {timings[name]*1000:.2f} ms ({size/1e6/timings[name]:.1f} MB/s)")
+        if outputs["legacy"] == outputs["scanner"]:
+            same = "same items"
         else:
-            print(f"[*] [{idx}/{total}] {model}: no allowed firmware in pub={pub}")
-    return model, []
+            same = f"items differ (legacy {len(outputs['legacy'])}, scanner {len(outputs['scanner'])})"
+        print(f"[+] {os.path.basename(path)}: {timings['legacy']/timings['scanner']:.2f}x speedup, {same}")
 
-async def _amain():
-    component_ids = [52117]
-    records: List[Dict[str, Any]] = []
-    old_fw = load_json(OUT_FW)
-    if isinstance(old_fw, list): records = old_fw
+async def _amain(record: bool = False, component_ids: Optional[List[int]] = None):
+    records: List[Dict[str, Any]] = load_rows(OUT_FW, VENDOR)
     seen = {(r.get("Model"), r.get("Download")) for r in records}
     headers = {
         "Accept": "application/json",
@@ -251,19 +373,21 @@ async def _amain():
         "Accept-Language": "en-US,en;q=0.9,ko;q=0.8"
     }
     async with aiohttp.ClientSession(headers=headers) as session:
-        models = load_json(OUT_MODELS)
+        # Explicit --components always rebuild the model list instead of reusing the saved one.
+        models = None if component_ids else load_json(OUT_MODELS)
         if not models:
-            models = await get_all_models(session, component_ids)
+            models = await get_all_models(session, component_ids or COMPONENT_IDS, record=record)
             save_json(OUT_MODELS, models)
             print(f"[+] Saved model list -> {OUT_MODELS}")
         print(f"[*] Total models: {len(models)}")
         targets = [(i, m["Model"], int(m.get("ComponentId") or 0)) for i, m in enumerate(models, 1) if isinstance(m, dict) and m.get("Model")]
         total = len(targets)
+        pub_stats = load_pub_stats()
         sem = asyncio.Semaphore(8)
         async def task(i: int, model: str, cid: int):
             async with sem:
                 try:
-                    return await fetch_firmware_by_component(session, model, cid, i, total)
+                    return await fetch_firmware_by_component(session, model, cid, i, total, pub_stats)
                 except Exception:
                     print(f"[-] [{i}/{total}] {model}: exception")
                     return model, []
@@ -273,7 +397,7 @@ async def _amain():
             model, items = await fut
             added = 0
             for r in items:
-                key = (r["Model"], r["Download"])
+                key = (r.get("Model"), r.get("Download"))
                 if key in seen: continue
                 seen.add(key); records.append(r); added += 1
                 if (len(records) - base) % 10 == 0:
@@ -290,6 +414,7 @@ async def _amain():
             else:
                 print(f"[*] {model}: +0 (processed {done}/{total})")
             if done % 25 == 0:
+                save_json(OUT_PUB_STATS, pub_stats)
                 try:
                     save_json(OUT_FW, records)
                     print(f"[*] checkpoint: processed {done}/{total}, total {len(records)} -> {OUT_FW}")
@@ -298,10 +423,18 @@ async def _amain():
                     save_json(OUT_FW, records)
                     print(f"[*] checkpoint(retry): processed {done}/{total}, total {len(records)} -> {OUT_FW}")
         save_json(OUT_FW, records)
+        save_json(OUT_PUB_STATS, pub_stats)
         print(f"[+] Firmware saved: total {len(records)} -> {OUT_FW}")
 
 def main():
-    asyncio.run(_amain())
+    args = sys.argv[1:]
+    if args and args[0] == "bench":
+        bench(args[1:])
+        return
+    component_ids = None
+    if "--components" in args and args.index("--components") + 1 < len(args):
+        component_ids = [int(c) for c in args[args.index("--components") + 1].split(",") if c.strip()]
+    asyncio.run(_amain(record="--record" in args, component_ids=component_ids))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,185 @@
+import json
+import os
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Canonical firmware row shared by every creator and the downloader. On disk each record is a flat
+# JSON object with the keys below plus any vendor-specific extras (Rev, Psid, Title, ...).
+CANONICAL_KEYS = ("Vendor", "Model", "Version", "Release", "Download", "ReleaseNotes")
+RELEASE_KEYS = ("Release", "Release_Date", "Release_date", "Date")
+NOTES_KEYS = ("ReleaseNotes", "ReleaseNotePDF")
+
+VENDOR_NAMES = {
+    "d-link": "D-Link", "dlink": "D-Link",
+    "foscam": "Foscam",
+    "iptime": "ipTIME",
+    "moxa": "MOXA",
+    "netgear": "NETGEAR",
+    "tp-link": "TP-Link", "tplink": "TP-Link",
+    "trendnet": "TRENDnet",
+    "ubiquiti": "Ubiquiti",
+    "zyxel": "Zyxel",
+}
+
+def canonical_vendor(name: Optional[str]) -> str:
+    name = (name or "").strip()
+    return VENDOR_NAMES.get(name.lower(), name)
+
+def _s(v: Any) -> str:
+    if v is None:
+        return ""
+    return v if isinstance(v, str) else str(v)
+
+@dataclass(slots=True)
+class FirmwareRecord:
+    vendor: str
+    model: str
+    download: str = ""
+    version: str = ""
+    release: str = ""
+    release_notes: str = ""
+    extra: Optional[Dict[str, Any]] = None
+
+    def __post_init__(self):
+        # Vendor and model repeat across thousands of rows; interning keeps one copy of each.
+        self.vendor = sys.intern(canonical_vendor(self.vendor))
+        self.model = sys.intern(_s(self.model))
+        self.download = _s(self.download)
+        self.version = _s(self.version)
+        self.release = _s(self.release)
+        self.release_notes = _s(self.release_notes)
+        if not self.extra:
+            self.extra = None
+
+    def key(self):
+        return (self.vendor, self.model, self.download or self.release_notes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Empty fields are left out, so rows stay as small as the vendor data allows.
+        d = {k: v for k, v in (
+            ("Vendor", self.vendor),
+            ("Model", self.model),
+            ("Version", self.version),
+            ("Release", self.release),
+            ("Download", self.download),
+            ("ReleaseNotes", self.release_notes),
+        ) if v}
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+def _first(d: Dict[str, Any], keys) -> str:
+    for k in keys:
+        v = d.get(k)
+        if v:
+            return _s(v)
+    return ""
+
+def _extras(d: Dict[str, Any], skip) -> Optional[Dict[str, Any]]:
+    out = {k: v for k, v in d.items() if k not in skip}
+    return out or None
+
+_SKIP_KEYS = frozenset(CANONICAL_KEYS + RELEASE_KEYS + NOTES_KEYS)
+
+def _adapt_generic(d: Dict[str, Any], vendor: str, psid_names: Optional[Dict[int, str]]) -> FirmwareRecord:
+    return FirmwareRecord(
+        vendor=d.get("Vendor") or vendor,
+        model=d.get("Model"),
+        download=d.get("Download"),
+        version=d.get("Version"),
+        release=_first(d, RELEASE_KEYS),
+        release_notes=_first(d, NOTES_KEYS),
+        extra=_extras(d, _SKIP_KEYS),
+    )
+
+def _adapt_moxa(d: Dict[str, Any], vendor: str, psid_names: Optional[Dict[int, str]]) -> FirmwareRecord:
+    # Older MOXA files carry "psid=<n>" in Vendor and have no Model at all.
+    raw = _s(d.get("Vendor"))
+    psid = d.get("Psid")
+    if psid is None and raw.startswith("psid="):
+        psid = raw[5:]
+    try:
+        psid = int(psid)
+    except (TypeError, ValueError):
+        pass
+    extra = _extras(d, _SKIP_KEYS | {"Psid"}) or {}
+    if psid is not None:
+        extra["Psid"] = psid
+    model = d.get("Model") or (psid_names or {}).get(psid) or (f"psid={psid}" if psid is not None else "")
+    return FirmwareRecord(
+        vendor="MOXA",
+        model=model,
+        download=d.get("Download"),
+        version=d.get("Version"),
+        release=_first(d, RELEASE_KEYS),
+        release_notes=_first(d, NOTES_KEYS),
+        extra=extra,
+    )
+
+ADAPTERS: Dict[str, Callable[..., FirmwareRecord]] = {
+    "MOXA": _adapt_moxa,
+}
+
+def from_dict(d: Dict[str, Any], vendor: Optional[str] = None,
+              psid_names: Optional[Dict[int, str]] = None) -> FirmwareRecord:
+    raw = _s(d.get("Vendor"))
+    name = "MOXA" if raw.startswith("psid=") else canonical_vendor(raw or vendor)
+    return ADAPTERS.get(name, _adapt_generic)(d, name, psid_names)
+
+def vendor_from_path(path: str) -> str:
+    # Creator outputs are named "<vendor>_..._links.json".
+    stem = os.path.basename(path).split("_", 1)[0]
+    return canonical_vendor(stem)
+
+def load_records(path: str, vendor: Optional[str] = None,
+                 psid_names: Optional[Dict[int, str]] = None) -> List[FirmwareRecord]:
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return []
+    vendor = vendor or vendor_from_path(path)
+    return [from_dict(d, vendor, psid_names) for d in data if isinstance(d, dict)] if isinstance(data, list) else []
+
+def load_rows(path: str, vendor: Optional[str] = None,
+              psid_names: Optional[Dict[int, str]] = None) -> List[Dict[str, Any]]:
+    # Creators resume from their previous output; rows written before the canonical schema are migrated here.
+    return [r.to_dict() for r in load_records(path, vendor, psid_names)]
+
+def merge_records(groups: Iterable[Iterable[FirmwareRecord]]) -> List[FirmwareRecord]:
+    seen = set()
+    out = []
+    for recs in groups:
+        for r in recs:
+            k = r.key()
+            if k in seen:
+                continue
+            seen.add(k)
+            out.append(r)
+    return out
+
+def save_records(path: str, records: Iterable[FirmwareRecord]):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump([r.to_dict() for r in records], f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def main():
+    if len(sys.argv) < 3:
+        print("usage: python FirmScrap_record.py <merged.json> <links.json> [<links.json> ...]")
+        return
+    out_path, inputs = sys.argv[1], sys.argv[2:]
+    groups = []
+    for p in inputs:
+        recs = load_records(p)
+        print(f"[*] {p}: {len(recs)} records ({vendor_from_path(p)})")
+        groups.append(recs)
+    merged = merge_records(groups)
+    save_records(out_path, merged)
+    print(f"[+] Merged {len(merged)} records -> {out_path}")
+
+if __name__ == "__main__":
+    main()
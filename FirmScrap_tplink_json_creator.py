@@ -8,11 +8,15 @@ from urllib.parse import urlparse
 import requests
 from bs4 import BeautifulSoup
 
+from FirmScrap_negative_cache import load_negative_cache, save_negative_cache, negative_reason, mark_negative, clear_negative
+from FirmScrap_record import FirmwareRecord, load_rows
+
 START_URL = "https://www.tp-link.com/us/support/download/"
 BASE_DL   = "https://www.tp-link.com/us/support/download/"
 OUT_MODELS_JSON   = "tplink_models.json"
 OUT_FIRMWARE_JSON = "tplink_firmware_links.json"
 SAVE_EVERY = 10
+VENDOR = "TP-Link"
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
@@ -32,6 +36,10 @@ def fetch_html(url: str, session: requests.Session) -> str:
     r.raise_for_status()
     return r.text
 
+def is_not_found(ex: Exception) -> bool:
+    # Most models have no Omada page at all; that 404 is an answer, not a failed request.
+    return isinstance(ex, requests.HTTPError) and ex.response is not None and ex.response.status_code in (404, 410)
+
 def extract_product_tree_blob(html: str) -> str:
     m = re.search(r"var\s+productTree\s*=\s*(\{.*?\});", html, re.DOTALL)
     if not m:
@@ -119,13 +127,13 @@ def parse_firmware_tables(html: str, fallback_model_label: str):
         if not download_url:
             continue
 
-        results.append({
-            "Vendor": "TP-Link",
-            "Model": model_text or fallback_model_label,
-            "Version": version_text,
-            "Release_Date": release_date,
-            "Download": download_url
-        })
+        results.append(FirmwareRecord(
+            vendor=VENDOR,
+            model=model_text or fallback_model_label,
+            version=version_text,
+            release=release_date,
+            download=download_url,
+        ).to_dict())
     return results
 
 def build_omada_download_page(slug: str) -> str:
@@ -188,48 +196,47 @@ def parse_omada_downloads(html: str, slug: str):
             model_text = title[:idx].strip()
             version_text = title[idx+1:].strip()
 
-        results.append({
-            "Vendor": "TP-Link",
-            "Model": model_text,
-            "Version": version_text,
-            "Release_Date": release_date,
-            "Download": href
-        })
+        results.append(FirmwareRecord(
+            vendor=VENDOR,
+            model=model_text,
+            version=version_text,
+            release=release_date,
+            download=href,
+        ).to_dict())
 
     return results
 
 def crawl_all_tplink_firmware():
     s = requests.Session()
 
-    results = []
-    seen = set()
-    if os.path.exists(OUT_FIRMWARE_JSON):
-        try:
-            with open(OUT_FIRMWARE_JSON, "r", encoding="utf-8") as f:
-                results = json.load(f)
-            for r in results:
-                seen.add((r.get("Model"), r.get("Download")))
-            print(f"[!] Previous {len(results)} results are loaded")
-        except Exception:
-            results = []
-            seen = set()
+    results = load_rows(OUT_FIRMWARE_JSON, VENDOR)
+    seen = {(r.get("Model"), r.get("Download")) for r in results}
+    if results:
+        print(f"[!] Previous {len(results)} results are loaded")
 
     models, slug_map = get_models_and_slugs(s)
+    negative = load_negative_cache(VENDOR)
 
     total = len(results)
     for i, model_name in enumerate(models, 1):
         slug = slug_map.get(model_name)
         if not slug:
             continue
+        reason = negative_reason(negative, VENDOR, slug)
+        if reason:
+            print(f"[{i}/{len(models)}] {model_name} -> skipped (cached: {reason})")
+            continue
 
         std_url = build_firmware_page(slug)
         added_now = 0
+        failed = False
         try:
             html = fetch_html(std_url, s)
             fw_entries = parse_firmware_tables(html, model_name)
         except Exception as ex:
             print(f"[-] Error {model_name} ({std_url}): {ex}")
             fw_entries = []
+            failed = not is_not_found(ex)
 
         if not fw_entries:
             omada_url = build_omada_download_page(slug)
@@ -239,10 +246,19 @@ def crawl_all_tplink_firmware():
                 if fw_entries:
                     print(f"[+] {len(fw_entries)} models found in Omada!: {model_name}")
             except Exception as ex:
-                print(f"[-] Error {model_name} ({omada_url}): {ex}")
+                if is_not_found(ex):
+                    print(f"[-] No Omada page for {model_name}")
+                else:
+                    print(f"[-] Error {model_name} ({omada_url}): {ex}")
+                    failed = True
+
+        if fw_entries:
+            clear_negative(negative, VENDOR, slug)
+        elif not failed:
+            mark_negative(negative, VENDOR, slug, "no firmware on standard or Omada page")
 
         for e in fw_entries:
-            key = (e["Model"], e["Download"])
+            key = (e.get("Model"), e.get("Download"))
             if key in seen:
                 continue
             results.append(e)
@@ -252,12 +268,14 @@ def crawl_all_tplink_firmware():
 
             if total % SAVE_EVERY == 0:
                 atomic_write_json(OUT_FIRMWARE_JSON, results)
+                save_negative_cache(VENDOR, negative)
                 print(f"[*] checkpoint: {total} entries -> {OUT_FIRMWARE_JSON}")
 
         print(f"[{i}/{len(models)}] {model_name} -> +{added_now} firmware")
         time.sleep(random.uniform(0.25, 0.7))
 
     atomic_write_json(OUT_FIRMWARE_JSON, results)
+    save_negative_cache(VENDOR, negative)
     print(f"\n[+] Done! {len(results)} links are saved.")
 
 if __name__ == "__main__":
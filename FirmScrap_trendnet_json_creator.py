@@ -2,12 +2,14 @@ import os, time, random, json, re
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse, parse_qs
+from FirmScrap_record import FirmwareRecord, load_rows
 
 START_URL = "https://www.trendnet.com/support/"
 BASE_URL  = "https://www.trendnet.com/support/"
 MODELS_JSON = "trendnet_models.json"
 FIRMWARE_JSON = "trendnet_firmware_links.json"
 SAVE_EVERY = 10
+VENDOR = "TRENDnet"
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
@@ -126,14 +128,14 @@ def parse_firmware_minimal(html: str, page_url: str, session: requests.Session):
 
         final_url = resolve_final_download_url(manager_url, session) or manager_url
 
-        results.append({
-            "Vendor": "TRENDnet",
-            "Model": model_tok,
-            "Prod": prod,
-            "Version": version,
-            "Release": release_date,
-            "Download": final_url
-        })
+        results.append(FirmwareRecord(
+            vendor=VENDOR,
+            model=model_tok,
+            version=version,
+            release=release_date,
+            download=final_url,
+            extra={"Prod": prod},
+        ).to_dict())
 
     return results
 
@@ -141,14 +143,9 @@ def crawl_all_trendnet_firmware():
     s = requests.Session()
     models = get_models_live()
 
-    all_fw = []
-    if os.path.exists(FIRMWARE_JSON):
-        try:
-            with open(FIRMWARE_JSON, "r", encoding="utf-8") as f:
-                all_fw = json.load(f)
-                print(f"[!] Previous {len(all_fw)} results are loaded")
-        except Exception:
-            all_fw = []
+    all_fw = load_rows(FIRMWARE_JSON, VENDOR)
+    if all_fw:
+        print(f"[!] Previous {len(all_fw)} results are loaded")
 
     for i, m in enumerate(models, 1):
         try:
@@ -1,17 +1,25 @@
 import os
 import re
+import sys
 import json
-import time
-import random
+import asyncio
 from datetime import datetime
 from urllib.parse import urljoin
 
-import requests
-from bs4 import BeautifulSoup, NavigableString
+import aiohttp
+
+from FirmScrap_iis_listing import (
+    parse_listing, load_listing_index, save_listing_index,
+    conditional_headers, stored_entries, remember_listing,
+)
+from FirmScrap_record import FirmwareRecord, load_rows
 
 ROOT = "https://download.trendnet.com/"
 SAVE_PATH = "trendnet_legacy_firmware_links.json"
+INDEX_PATH = "trendnet_legacy_listing_index.json"
 SAVE_EVERY = 10
+MAX_CONC = 16
+VENDOR = "TRENDnet"
 
 HEADERS = {
     "User-Agent": (
@@ -31,29 +39,40 @@ def atomic_write_json(path: str, data) -> None:
         json.dump(data, f, indent=2, ensure_ascii=False)
     os.replace(tmp, path)
 
-def fetch_html(url: str, session: requests.Session) -> str:
-    r = session.get(url, headers=HEADERS, timeout=30, allow_redirects=True)
-    print(f"[DEBUG] GET {url} -> {r.status_code} / final={r.url} / len={len(r.text)}")
-    r.raise_for_status()
-    return r.text
-
-def list_model_dirs(session: requests.Session):
-    html = fetch_html(ROOT, session)
-    soup = BeautifulSoup(html, "html.parser")
-    pre = soup.find("pre")
-    if not pre:
-        return []
-
-    models = []
-    for a in pre.find_all("a", href=True):
-        name = a.get_text(strip=True)
-        href = a["href"]
-        if not href.endswith("/") or "[To Parent Directory]" in name:
+async def fetch_html(session: aiohttp.ClientSession, url: str, headers=None, max_retry=3):
+    # Returns (html, Last-Modified); html is None when the server answered 304 Not Modified.
+    backoff = 1.6
+    for attempt in range(1, max_retry + 1):
+        try:
+            async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as r:
+                if r.status == 304:
+                    return None, headers.get("If-Modified-Since") if headers else None
+                if r.status == 404:
+                    return "", None
+                if r.status >= 500 or r.status == 429:
+                    await asyncio.sleep(min(8, backoff ** attempt))
+                    continue
+                r.raise_for_status()
+                return await r.text(errors="ignore"), r.headers.get("Last-Modified")
+        except aiohttp.ClientResponseError:
+            raise
+        except Exception:
+            if attempt == max_retry:
+                raise
+            await asyncio.sleep(min(8, backoff ** attempt))
+    raise aiohttp.ClientError(f"giving up on {url} after {max_retry} attempts")
+
+async def list_model_dirs(session: aiohttp.ClientSession):
+    # Returns {model: timestamp of its top-level directory entry}.
+    html, _ = await fetch_html(session, ROOT)
+    models = {}
+    for e in parse_listing(html):
+        if not e["href"].endswith("/"):
             continue
-        model = href.strip("/").split("/")[0]
+        model = e["href"].strip("/").split("/")[0]
         if model:
-            models.append(model)
-    return sorted(set(models))
+            models[model] = e["stamp"]
+    return dict(sorted(models.items()))
 
 def parse_release_date(text_block: str) -> str | None:
     m = re.search(r"(\d{1,2}/\d{1,2}/\d{4})\s+\d{1,2}:\d{2}\s+[AP]M", text_block)
@@ -66,92 +85,99 @@ def parse_release_date(text_block: str) -> str | None:
     except Exception:
         return raw
 
-def list_firmware_files_for_model(model: str, session: requests.Session):
-    fw_url = urljoin(ROOT, f"{model}/Firmware/")
+def firmware_dir_url(model: str) -> str:
+    return urljoin(ROOT, f"{model}/Firmware/")
+
+async def list_firmware_files_for_model(session: aiohttp.ClientSession, model: str, index=None, stamp=None,
+                                        revalidate=True):
+    fw_url = firmware_dir_url(model)
+    headers = conditional_headers(index, fw_url) if index is not None and revalidate else None
     try:
-        html = fetch_html(fw_url, session)
+        html, last_modified = await fetch_html(session, fw_url, headers)
     except Exception as e:
         print(f"[-] Firmware dir not available for {model}: {e}")
         return []
 
-    soup = BeautifulSoup(html, "html.parser")
-    pre = soup.find("pre")
-    if not pre:
-        return []
+    if html is None:
+        listing = stored_entries(index, fw_url)
+        index[fw_url]["stamp"] = stamp
+    else:
+        listing = parse_listing(html)
+        # A missing Firmware/ dir (404) is remembered as empty so unchanged models without one are skipped next time.
+        if index is not None:
+            remember_listing(index, fw_url, stamp, listing, last_modified)
 
     entries = []
-    for a in pre.find_all("a", href=True):
-        name = a.get_text(strip=True)
-        href = a["href"]
-        if "[To Parent Directory]" in name or href.endswith("/"):
+    for e in listing:
+        if e["href"].endswith("/"):
             continue
 
-        abs_url = urljoin(ROOT, href)
+        abs_url = urljoin(ROOT, e["href"])
         if not any(abs_url.lower().endswith(ext) for ext in FIRMWARE_EXTS):
             continue
 
-        prev_txt = ""
-        prev = a.previous_sibling
-        if isinstance(prev, NavigableString):
-            prev_txt = str(prev)
-        release_date = parse_release_date(prev_txt)
-
-        entries.append({
-            "Model": model,
-            "Download": abs_url,
-            "Release_date": release_date
-        })
+        entries.append(FirmwareRecord(
+            vendor=VENDOR,
+            model=model,
+            release=parse_release_date(e["prefix"]) or (e["stamp"] or "")[:10],
+            download=abs_url,
+        ).to_dict())
     return entries
 
-def main():
-    session = requests.Session()
-
-    results = []
-    seen = set()
-    if os.path.exists(SAVE_PATH):
-        try:
-            with open(SAVE_PATH, "r", encoding="utf-8") as f:
-                results = json.load(f)
-            for r in results:
-                seen.add((r.get("Model"), r.get("Download")))
-            print(f"[!] loaded existing {len(results)} entries")
-        except Exception:
-            results = []
-            seen = set()
-
-    models = list_model_dirs(session)
-    print(f"[+] discovered {len(models)} top-level dirs (model candidates)")
-
-    total = 0
-    for i, model in enumerate(models, 1):
-        try:
-            fw_files = list_firmware_files_for_model(model, session)
+async def _amain(full: bool = False):
+    results = load_rows(SAVE_PATH, VENDOR)
+    seen = {(r.get("Model"), r.get("Download")) for r in results}
+    if results:
+        print(f"[!] loaded existing {len(results)} entries")
+
+    connector = aiohttp.TCPConnector(limit_per_host=MAX_CONC)
+    async with aiohttp.ClientSession(headers=HEADERS, connector=connector) as session:
+        index = load_listing_index(INDEX_PATH)
+        model_stamps = await list_model_dirs(session)
+        print(f"[+] discovered {len(model_stamps)} top-level dirs (model candidates)")
+        # The <model>/ stamp in the root listing does not move when a file is added under <model>/Firmware/,
+        # so it cannot be used to skip a model. Every Firmware/ dir is revalidated with If-Modified-Since
+        # instead; unchanged ones come back as a bodiless 304 and are answered from the index.
+        models = list(model_stamps)
+
+        sem = asyncio.Semaphore(MAX_CONC)
+        async def task(model: str):
+            async with sem:
+                try:
+                    return model, await list_firmware_files_for_model(session, model, index, model_stamps[model], not full)
+                except Exception as ex:
+                    print(f"[-] {model}: {ex}")
+                    return model, []
+
+        total = 0
+        done = 0
+        for fut in asyncio.as_completed([task(m) for m in models]):
+            model, fw_files = await fut
+            done += 1
             added_now = 0
             for e in fw_files:
-                key = (e["Model"], e["Download"])
+                key = (e.get("Model"), e.get("Download"))
                 if key in seen:
                     continue
-                results.append({
-                    "Vendor": "TRENDnet",
-                    "Model": e["Model"],
-                    "Download": e["Download"],
-                    "Release_date": e["Release_date"]
-                })
+                results.append(e)
                 seen.add(key)
                 total += 1
                 added_now += 1
 
                 if total % SAVE_EVERY == 0:
                     atomic_write_json(SAVE_PATH, results)
+                    save_listing_index(INDEX_PATH, index)
                     print(f"[*] Checkpoint: {total} entries -> {SAVE_PATH}")
 
-            print(f"[{i}/{len(models)}] {model}: +{added_now} firmware files")
-            time.sleep(random.uniform(0.2, 0.6))
-        except Exception as ex:
-            print(f"[-] {model}: {ex}")
+            print(f"[{done}/{len(models)}] {model}: +{added_now} firmware files")
+
+        save_listing_index(INDEX_PATH, index)
 
     atomic_write_json(SAVE_PATH, results)
     print(f"\n[+] Done! {len(results)} links are saved.")
 
+def main():
+    asyncio.run(_amain("--full" in sys.argv[1:]))
+
 if __name__ == "__main__":
     main()
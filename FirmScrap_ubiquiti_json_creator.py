@@ -1,6 +1,7 @@
 import asyncio, aiohttp, json, os, re, sys, tempfile
 from typing import Any, Dict, List, Optional, Set
 from urllib.parse import urlparse
+from FirmScrap_record import FirmwareRecord, load_rows
 
 BASE = "https://download.svc.ui.com/v1"
 DOWNLOADS_TMPL = BASE + "/downloads?page={page}"
@@ -8,6 +9,11 @@ SLUG_API_TMPL  = BASE + "/downloads/products/slugs/{slug}"
 
 OUT_SLUGS = "ubiquiti_all_slugs.json"
 OUT_FW    = "ubiquiti_firmware_links.json"
+OUT_SEEN  = "ubiquiti_seen_downloads.json"
+
+MAX_PAGES = 2000
+PAGE_WINDOW = 8
+SLUG_SAVE_EVERY = 25
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; UbiquitiCrawler/1.0)",
@@ -139,29 +145,54 @@ def _is_firmware_entry(d: Dict[str, Any]) -> bool:
     url = _pick_file_url(d) or ""
     return _is_firmware_url(url)
 
-async def get_all_models(session: aiohttp.ClientSession) -> List[str]:
-    page = 1
+async def get_all_models(session: aiohttp.ClientSession, incremental: bool = False) -> List[str]:
+    # Pages are fetched PAGE_WINDOW at a time but consumed in order; the first page without
+    # downloads ends the listing, and everything still in flight past it is cancelled.
     all_slugs: Set[str] = set()
-    while True:
-        url = DOWNLOADS_TMPL.format(page=page)
-        data = await _http_get_json(session, url)
-        if not data or not isinstance(data, dict):
-            break
-        downloads = data.get("downloads")
-        if not downloads or not isinstance(downloads, list):
-            break
-        new_slugs = _extract_slugs_from_payload(data)
-        before = len(all_slugs)
-        all_slugs |= new_slugs
-        save_json(OUT_SLUGS, sorted(all_slugs))
-        print(f"[*] Slug page {page}: +{len(all_slugs) - before} (total {len(all_slugs)})")
-        page += 1
-        if len(downloads) == 0:
-            break
-        if page > 2000:
-            print("[!] page > 2000, stopping.")
-            break
+    if incremental:
+        all_slugs = {normalize_slug(s) for s in load_json(OUT_SLUGS) or []}
+    known_dates: Set[str] = set(load_json(OUT_SEEN) or [])
+    new_dates: Set[str] = set()
+    pending: Dict[int, asyncio.Task] = {}
+    next_fetch = 1
+    page = 1
+    unsaved = 0
+    if incremental:
+        print(f"[*] incremental mode: {len(all_slugs)} known slugs, {len(known_dates)} known publish dates")
+    try:
+        while page <= MAX_PAGES:
+            while len(pending) < PAGE_WINDOW and next_fetch <= MAX_PAGES:
+                url = DOWNLOADS_TMPL.format(page=next_fetch)
+                pending[next_fetch] = asyncio.create_task(_http_get_json(session, url))
+                next_fetch += 1
+            data = await pending.pop(page)
+            downloads = data.get("downloads") if isinstance(data, dict) else None
+            if not downloads or not isinstance(downloads, list):
+                print(f"[*] Slug page {page}: no downloads, end of listing")
+                break
+            dates = {d["date_published"] for d in downloads if isinstance(d, dict) and d.get("date_published")}
+            if incremental and dates and dates <= known_dates:
+                print(f"[*] Slug page {page}: only known entries, stopping")
+                break
+            new_dates |= dates
+            new_slugs = _extract_slugs_from_payload(data)
+            before = len(all_slugs)
+            all_slugs |= new_slugs
+            print(f"[*] Slug page {page}: +{len(all_slugs) - before} (total {len(all_slugs)})")
+            unsaved += 1
+            if unsaved >= SLUG_SAVE_EVERY:
+                save_json(OUT_SLUGS, sorted(all_slugs))
+                unsaved = 0
+            page += 1
+        else:
+            print(f"[!] page > {MAX_PAGES}, stopping.")
+    finally:
+        for t in pending.values():
+            t.cancel()
+        await asyncio.gather(*pending.values(), return_exceptions=True)
     slugs = sorted(all_slugs)
+    save_json(OUT_SLUGS, slugs)
+    save_json(OUT_SEEN, sorted(known_dates | new_dates))
     print(f"[+] Slug harvested {len(slugs)} unique slugs -> {OUT_SLUGS}")
     return slugs
 
@@ -188,25 +219,22 @@ async def fetch_firmware_list(session: aiohttp.ClientSession, model: str) -> Lis
         dl = _pick_file_url(d)
         if not dl:
             continue
-        out.append({
-            "Vendor": VENDOR,
-            "Model": model,
-            "Version": d.get("version"),
-            "Release": d.get("date_published"),
-            "Download": dl,
-        })
-    out.sort(key=lambda x: (x.get("Release") or "", x.get("Version") or ""), reverse=True)
+        out.append(FirmwareRecord(
+            vendor=VENDOR,
+            model=model,
+            version=d.get("version"),
+            release=d.get("date_published"),
+            download=dl,
+        ).to_dict())
+    out.sort(key=lambda x: (x.get("Release", ""), x.get("Version", "")), reverse=True)
     return out
 
-async def _amain(mode: str = "all"):
-    records: List[Dict[str, Any]] = []
-    old = load_json(OUT_FW)
-    if isinstance(old, list):
-        records = old
+async def _amain(mode: str = "all", incremental: bool = False):
+    records: List[Dict[str, Any]] = load_rows(OUT_FW, VENDOR)
     seen = {(r.get("Model"), r.get("Version"), r.get("Download")) for r in records}
     async with aiohttp.ClientSession() as session:
         if mode in ("slugs", "all"):
-            slugs = await get_all_models(session)
+            slugs = await get_all_models(session, incremental)
         else:
             if not os.path.exists(OUT_SLUGS):
                 print(f"[-] No exists {OUT_SLUGS}!")
@@ -228,7 +256,7 @@ async def _amain(mode: str = "all"):
                 model, items = await coro
                 added = 0
                 for r in items:
-                    key = (r["Model"], r["Version"], r["Download"])
+                    key = (r.get("Model"), r.get("Version"), r.get("Download"))
                     if key in seen:
                         continue
                     seen.add(key)
@@ -244,8 +272,9 @@ async def _amain(mode: str = "all"):
             print(f"\n[+] Done! {len(records)} links are saved -> {OUT_FW}")
 
 def main():
-    mode = (sys.argv[1] if len(sys.argv) > 1 else "all").lower()
-    asyncio.run(_amain(mode))
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    mode = (args[0] if args else "all").lower()
+    asyncio.run(_amain(mode, "--incremental" in sys.argv[1:]))
 
 if __name__ == "__main__":
     main()
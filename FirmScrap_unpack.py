@@ -0,0 +1,249 @@
+import bz2
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import posixpath
+import shutil
+import sys
+import tarfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+UNPACK_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+CHUNK_SIZE = 1 << 20
+MAX_MEMBER_BYTES = 2 << 30
+# Caps on a whole archive, so many members that each stay under MAX_MEMBER_BYTES cannot fill the disk.
+MAX_TOTAL_BYTES = 8 << 30
+MAX_MEMBERS = 50000
+RESULTS_FILE = "unpack_results.json"
+
+FIRMWARE_EXTS = (".bin", ".img", ".trx", ".chk")
+DOC_EXTS = (".pdf", ".txt", ".htm", ".html", ".doc", ".docx", ".rtf", ".md5", ".sha256", ".xml")
+IMAGE_KINDS = {"trx", "uimage", "squashfs", "firmware"}
+
+# (offset, magic, kind, extension)
+MAGICS = [
+    (0, b"PK\x03\x04", "zip", ".zip"),
+    (0, b"PK\x05\x06", "zip", ".zip"),
+    (0, b"\x1f\x8b", "gzip", ".gz"),
+    (0, b"BZh", "bzip2", ".bz2"),
+    (0, b"\xfd7zXZ\x00", "xz", ".xz"),
+    (0, b"7z\xbc\xaf\x27\x1c", "7z", ".7z"),
+    (0, b"Rar!\x1a\x07", "rar", ".rar"),
+    (257, b"ustar", "tar", ".tar"),
+    (0, b"%PDF", "pdf", ".pdf"),
+    (0, b"HDR0", "trx", ".trx"),
+    (0, b"\x27\x05\x19\x56", "uimage", ".bin"),
+    (0, b"hsqs", "squashfs", ".bin"),
+    (0, b"sqsh", "squashfs", ".bin"),
+    (0, b"\x7fELF", "elf", ".bin"),
+]
+HTML_PREFIXES = (b"<!doctype html", b"<html", b"<?xml", b"<head")
+
+def sniff_bytes(head: bytes) -> str:
+    for off, magic, kind, _ in MAGICS:
+        if head[off:off + len(magic)] == magic:
+            return kind
+    if head.lstrip()[:14].lower().startswith(HTML_PREFIXES):
+        return "html"
+    return "firmware" if head else "empty"
+
+def sniff_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return sniff_bytes(f.read(512))
+
+def kind_extension(kind: str) -> Optional[str]:
+    for _, _, k, ext in MAGICS:
+        if k == kind:
+            return ext
+    return {"html": ".html", "firmware": ".bin"}.get(kind)
+
+def _safe_name(name: str) -> Optional[str]:
+    # Archive member names are untrusted; anything absolute or escaping the target directory is skipped.
+    name = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+    if not name or name == "." or name.startswith("../") or name == "..":
+        return None
+    return name
+
+def _new_budget() -> Dict[str, int]:
+    return {"members": 0, "bytes": 0}
+
+def _copy_hashed(src, dest_path: str, budget: Dict[str, int]) -> Dict[str, Any]:
+    budget["members"] += 1
+    if budget["members"] > MAX_MEMBERS:
+        raise ValueError(f"archive has more than {MAX_MEMBERS} members")
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    h = hashlib.sha256()
+    size = 0
+    head = b""
+    with open(dest_path, "wb") as out:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if not head:
+                head = chunk[:512]
+            size += len(chunk)
+            budget["bytes"] += len(chunk)
+            if size > MAX_MEMBER_BYTES:
+                raise ValueError(f"member larger than {MAX_MEMBER_BYTES} bytes")
+            if budget["bytes"] > MAX_TOTAL_BYTES:
+                raise ValueError(f"archive expands to more than {MAX_TOTAL_BYTES} bytes")
+            h.update(chunk)
+            out.write(chunk)
+    return {"SHA256": h.hexdigest(), "Size": size, "Kind": sniff_bytes(head)}
+
+def _unpack_zip(path: str, dest: str) -> List[Dict[str, Any]]:
+    members = []
+    budget = _new_budget()
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            name = _safe_name(info.filename)
+            if not name:
+                continue
+            with zf.open(info) as src:
+                members.append({"Name": name, **_copy_hashed(src, os.path.join(dest, name), budget)})
+    return members
+
+def _unpack_tar(path: str, dest: str) -> List[Dict[str, Any]]:
+    # "r|*" reads the archive strictly front to back, whatever the compression, without seeking.
+    members = []
+    budget = _new_budget()
+    with tarfile.open(path, mode="r|*") as tf:
+        for info in tf:
+            if not info.isfile():
+                continue
+            name = _safe_name(info.name)
+            src = tf.extractfile(info) if name else None
+            if src is None:
+                continue
+            members.append({"Name": name, **_copy_hashed(src, os.path.join(dest, name), budget)})
+    return members
+
+def _unpack_compressed(path: str, dest: str, opener, suffix: str) -> List[Dict[str, Any]]:
+    # A compressed tarball unpacks as a tar; a single compressed file becomes one member.
+    try:
+        return _unpack_tar(path, dest)
+    except tarfile.ReadError:
+        shutil.rmtree(dest, ignore_errors=True)
+    name = os.path.basename(path)
+    name = name[:-len(suffix)] if name.lower().endswith(suffix) else f"{name}.out"
+    with opener(path, "rb") as src:
+        return [{"Name": name, **_copy_hashed(src, os.path.join(dest, name), _new_budget())}]
+
+UNPACKERS = {
+    "zip": _unpack_zip,
+    "tar": _unpack_tar,
+    "gzip": partial(_unpack_compressed, opener=gzip.open, suffix=".gz"),
+    "bzip2": partial(_unpack_compressed, opener=bz2.open, suffix=".bz2"),
+    "xz": partial(_unpack_compressed, opener=lzma.open, suffix=".xz"),
+}
+
+def pick_firmware(members: List[Dict[str, Any]]) -> Optional[str]:
+    # Known image extensions first, then anything whose bytes look like an image, then the largest
+    # member that is not obviously documentation.
+    by_ext = [m for m in members if m["Name"].lower().endswith(FIRMWARE_EXTS)]
+    if by_ext:
+        return max(by_ext, key=lambda m: m["Size"])["Name"]
+    by_kind = [m for m in members if m["Kind"] in IMAGE_KINDS and not m["Name"].lower().endswith(DOC_EXTS)]
+    if by_kind:
+        return max(by_kind, key=lambda m: m["Size"])["Name"]
+    rest = [m for m in members if not m["Name"].lower().endswith(DOC_EXTS) and m["Kind"] not in ("pdf", "html")]
+    return max(rest, key=lambda m: m["Size"])["Name"] if rest else None
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def fix_extension(path: str, kind: str) -> str:
+    # The HTTP downloader names files <model>_<version>.zip; give them the extension of what they really are.
+    ext = kind_extension(kind)
+    root, cur = os.path.splitext(path)
+    if not ext or cur.lower() != ".zip" or ext == ".zip":
+        return path
+    new_path = root + ext
+    if os.path.exists(new_path):
+        return path
+    os.replace(path, new_path)
+    return new_path
+
+def unpack_file(path: str) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"Source": path}
+    try:
+        kind = sniff_file(path)
+        path = fix_extension(path, kind)
+        result.update({"Path": path, "FileType": kind, "SHA256": _file_sha256(path), "Size": os.path.getsize(path)})
+        unpacker = UNPACKERS.get(kind)
+        if not unpacker:
+            result["Firmware"] = os.path.basename(path) if kind in IMAGE_KINDS else None
+            return result
+        dest = f"{path}.extracted"
+        try:
+            members = unpacker(path, dest)
+        except Exception:
+            # Do not leave a half-extracted (possibly huge) tree behind.
+            shutil.rmtree(dest, ignore_errors=True)
+            raise
+        result.update({"UnpackDir": dest, "Members": members, "Firmware": pick_firmware(members)})
+    except Exception as e:
+        result["Error"] = f"{type(e).__name__}: {e}"
+    return result
+
+def result_extras(result: Dict[str, Any]) -> Dict[str, Any]:
+    # The subset written back onto the manifest record.
+    out = {
+        "LocalPath": result.get("Path") or result.get("Source"),
+        "FileType": result.get("FileType"),
+        "SHA256": result.get("SHA256"),
+        "FirmwareMember": result.get("Firmware"),
+    }
+    if result.get("Members") is not None:
+        out["Members"] = [{"Name": m["Name"], "Size": m["Size"], "SHA256": m["SHA256"]} for m in result["Members"]]
+    if result.get("Error"):
+        out["UnpackError"] = result["Error"]
+    return out
+
+def _iter_paths(args: List[str]):
+    for a in args:
+        if os.path.isdir(a):
+            for root, dirs, files in os.walk(a):
+                dirs[:] = [d for d in dirs if not d.endswith(".extracted")]
+                for f in files:
+                    if not f.endswith(".part"):
+                        yield os.path.join(root, f)
+        elif os.path.isfile(a):
+            yield a
+
+def main():
+    # python FirmScrap_unpack.py <dir or file> [...]    unpack already-downloaded files in parallel
+    paths = list(_iter_paths(sys.argv[1:]))
+    if not paths:
+        print("usage: python FirmScrap_unpack.py <download dir or file> [...]")
+        return
+    print(f"[*] Unpacking {len(paths)} files with {UNPACK_WORKERS} processes")
+    results = []
+    with ProcessPoolExecutor(max_workers=UNPACK_WORKERS) as pool:
+        for fut in as_completed([pool.submit(unpack_file, p) for p in paths]):
+            r = fut.result()
+            results.append(r)
+            if r.get("Error"):
+                print(f"[-] {r['Source']}: {r['Error']}")
+            else:
+                print(f"[+] {r['Path']}: {r['FileType']}, firmware={r.get('Firmware')}")
+    tmp = f"{RESULTS_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, RESULTS_FILE)
+    print(f"[+] Done! {len(results)} results -> {RESULTS_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from FirmScrap_columnar import load_manifest, save_manifest
+from FirmScrap_record import FirmwareRecord, from_dict
+
+# Several downloader processes (on one box or many) share one manifest through a lease table:
+#   pending -> leased (worker, lease_until, attempts+1) -> done | pending again | failed
+# A worker holds each job for LEASE_TTL seconds and heartbeats to extend it while downloading. A lease
+# that runs out (worker crashed, network gone) goes back to pending on the next lease/stats call, and
+# the attempt number handed out with each lease fences off late reports from the previous holder.
+LEASE_TTL = 300
+BATCH_SIZE = 16
+MAX_ATTEMPTS = 3
+DEFAULT_PORT = 8765
+HTTP_TIMEOUT = 30
+HTTP_RETRY = 3
+TOKEN_HEADER = "X-Queue-Token"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    record TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_until);
+"""
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class SqliteQueue:
+    # One host: every process opens the same file. WAL plus BEGIN IMMEDIATE makes each lease an atomic
+    # read-modify-write, so two workers can never take the same row.
+    def __init__(self, path: str, max_attempts: int = MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def _write(self, fn):
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self.db)
+                self.db.execute("COMMIT")
+                return out
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def _requeue_expired(self, db, now: float) -> int:
+        db.execute("UPDATE jobs SET state='failed', error='lease expired', worker=NULL, updated=? "
+                   "WHERE state='leased' AND lease_until<? AND attempts>=?", (now, now, self.max_attempts))
+        return db.execute("UPDATE jobs SET state='pending', worker=NULL, updated=? "
+                          "WHERE state='leased' AND lease_until<?", (now, now)).rowcount
+
+    def enqueue(self, records: List[Dict[str, Any]]) -> int:
+        # Rows are keyed like merge_records (vendor, model, download or notes); re-enqueueing a manifest
+        # only adds what is new, so finished work is never handed out twice.
+        rows = []
+        for d in records:
+            rec = from_dict(d)
+            rows.append((json.dumps(rec.key(), ensure_ascii=False), json.dumps(rec.to_dict(), ensure_ascii=False), time.time()))
+        def fn(db):
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO jobs (key, record, updated) VALUES (?, ?, ?)", rows)
+            return db.total_changes - before
+        return self._write(fn)
+
+    def lease(self, worker: str, n: int = BATCH_SIZE, ttl: float = LEASE_TTL) -> List[Dict[str, Any]]:
+        def fn(db):
+            now = time.time()
+            self._requeue_expired(db, now)
+            ids = [r[0] for r in db.execute("SELECT id FROM jobs WHERE state='pending' ORDER BY id LIMIT ?", (n,))]
+            if not ids:
+                return []
+            marks = ",".join("?" * len(ids))
+            db.execute(f"UPDATE jobs SET state='leased', worker=?, lease_until=?, attempts=attempts+1, updated=? "
+                       f"WHERE id IN ({marks})", (worker, now + ttl, now, *ids))
+            rows = db.execute(f"SELECT id, attempts, record FROM jobs WHERE id IN ({marks}) ORDER BY id", ids)
+            return [{"Id": i, "Attempt": a, "Record": json.loads(r)} for i, a, r in rows]
+        return self._write(fn)
+
+    def heartbeat(self, worker: str, leases: List[Tuple[int, int]], ttl: float = LEASE_TTL) -> List[int]:
+        # Returns the job ids still held; anything missing was reclaimed and must not be reported.
+        def fn(db):
+            now = time.time()
+            held = []
+            for job_id, attempt in leases:
+                cur = db.execute("UPDATE jobs SET lease_until=?, updated=? "
+                                 "WHERE id=? AND attempts=? AND worker=? AND state='leased'",
+                                 (now + ttl, now, job_id, attempt, worker))
+                if cur.rowcount:
+                    held.append(job_id)
+            return held
+        return self._write(fn)
+
+    def complete(self, worker: str, job_id: int, attempt: int, result: Optional[Dict[str, Any]] = None) -> bool:
+        def fn(db):
+            cur = db.execute("UPDATE jobs SET state='done', lease_until=NULL, error=NULL, result=?, updated=? "
+                             "WHERE id=? AND attempts=? AND worker=? AND state='leased'",
+                             (json.dumps(result or {}, ensure_ascii=False), time.time(), job_id, attempt, worker))
+            return cur.rowcount == 1
+        return self._write(fn)
+
+    def fail(self, worker: str, job_id: int, attempt: int, error: str = "") -> bool:
+        # Back to pending for another worker to try, until MAX_ATTEMPTS is spent.
+        def fn(db):
+            cur = db.execute("UPDATE jobs SET state=CASE WHEN attempts>=? THEN 'failed' ELSE 'pending' END, "
+                             "worker=NULL, lease_until=NULL, error=?, updated=? "
+                             "WHERE id=? AND attempts=? AND worker=? AND state='leased'",
+                             (self.max_attempts, error, time.time(), job_id, attempt, worker))
+            return cur.rowcount == 1
+        return self._write(fn)
+
+    def stats(self) -> Dict[str, int]:
+        def fn(db):
+            self._requeue_expired(db, time.time())
+            return dict(db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        counts = self._write(fn)
+        return {s: counts.get(s, 0) for s in ("pending", "leased", "done", "failed")}
+
+    def export(self) -> List[FirmwareRecord]:
+        # The manifest as the workers left it: extras they reported (unpack, entropy, ...) plus queue state.
+        with self.lock:
+            rows = self.db.execute("SELECT record, state, worker, attempts, error, result FROM jobs ORDER BY id").fetchall()
+        out = []
+        for record, state, worker, attempts, error, result in rows:
+            rec = from_dict(json.loads(record))
+            extra = {**(rec.extra or {}), **json.loads(result or "{}"), "QueueState": state, "Attempts": attempts}
+            if error:
+                extra["QueueError"] = error
+            rec.extra = extra
+            out.append(rec)
+        return out
+
+    def close(self):
+        self.db.close()
+
+# Methods the HTTP server exposes; each is POST /<name> with the keyword arguments as a JSON object.
+REMOTE_METHODS = ("enqueue", "lease", "heartbeat", "complete", "fail", "stats")
+REMOTE_ARG_TYPES = {"n": int, "ttl": float, "job_id": int, "attempt": int}
+
+class HttpQueue:
+    # Several hosts: same interface, forwarded to a FirmScrap_work_queue.py serve process.
+    def __init__(self, url: str, token: Optional[str] = None):
+        self.url = url.rstrip("/")
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        if token:
+            self.session.headers[TOKEN_HEADER] = token
+
+    def _call(self, method: str, **kwargs):
+        # Connection problems and 5xx are retried; a 4xx (bad token, bad arguments) will not get better.
+        last_error = None
+        for attempt in range(1, HTTP_RETRY + 1):
+            try:
+                with self.lock:
+                    r = self.session.post(f"{self.url}/{method}", json=kwargs, timeout=HTTP_TIMEOUT)
+            except requests.exceptions.RequestException as e:
+                last_error = e
+                time.sleep(min(8, 2 ** attempt))
+                continue
+            if r.status_code >= 500:
+                last_error = f"HTTP {r.status_code}"
+                time.sleep(min(8, 2 ** attempt))
+                continue
+            if r.status_code >= 400:
+                raise RuntimeError(f"queue server refused {method}: HTTP {r.status_code} {r.text.strip()}")
+            return r.json()["result"]
+        raise RuntimeError(f"queue server unreachable: {self.url} - {last_error}")
+
+    def enqueue(self, records):
+        return self._call("enqueue", records=records)
+
+    def lease(self, worker, n=BATCH_SIZE, ttl=LEASE_TTL):
+        return self._call("lease", worker=worker, n=n, ttl=ttl)
+
+    def heartbeat(self, worker, leases, ttl=LEASE_TTL):
+        return self._call("heartbeat", worker=worker, leases=[list(l) for l in leases], ttl=ttl)
+
+    def complete(self, worker, job_id, attempt, result=None):
+        return self._call("complete", worker=worker, job_id=job_id, attempt=attempt, result=result)
+
+    def fail(self, worker, job_id, attempt, error=""):
+        return self._call("fail", worker=worker, job_id=job_id, attempt=attempt, error=error)
+
+    def stats(self):
+        return self._call("stats")
+
+    def close(self):
+        self.session.close()
+
+def open_queue(spec: str, token: Optional[str] = None):
+    if spec.startswith(("http://", "https://")):
+        return HttpQueue(spec, token)
+    return SqliteQueue(spec)
+
+def make_server(queue: SqliteQueue, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                token: Optional[str] = None) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            method = self.path.strip("/")
+            if token and self.headers.get(TOKEN_HEADER) != token:
+                return self._reply(403, {"error": "bad token"})
+            if method not in REMOTE_METHODS:
+                return self._reply(404, {"error": f"unknown method: {method}"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                kwargs = json.loads(self.rfile.read(length) or b"{}")
+                # Check argument types here, so bad input gets a 400 instead of an error from SQLite.
+                for name, cast in REMOTE_ARG_TYPES.items():
+                    if name in kwargs:
+                        kwargs[name] = cast(kwargs[name])
+                if not isinstance(kwargs.get("worker", ""), str):
+                    raise TypeError("worker must be a string")
+                if method == "heartbeat":
+                    kwargs["leases"] = [(int(job_id), int(attempt)) for job_id, attempt in kwargs.get("leases", [])]
+                self._reply(200, {"result": getattr(queue, method)(**kwargs)})
+            except (TypeError, ValueError, AttributeError, sqlite3.InterfaceError, sqlite3.ProgrammingError) as e:
+                # Malformed arguments: retrying the same request cannot help.
+                self._reply(400, {"error": f"{type(e).__name__}: {e}"})
+            except Exception as e:
+                # Anything else (e.g. a locked database) is the server's problem; the client retries 5xx.
+                print(f"[-] {method} failed: {type(e).__name__}: {e}")
+                self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def _reply(self, status: int, body: Dict[str, Any]):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+class Heartbeat:
+    # Background thread that keeps a worker's leases alive while their downloads run.
+    def __init__(self, queue, worker: str, ttl: float = LEASE_TTL):
+        self.queue = queue
+        self.worker = worker
+        self.ttl = ttl
+        self.held: Dict[int, int] = {}
+        # Keyed by (job id, attempt): the same job may come back to this worker under a new attempt.
+        self.lost: set = set()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def add(self, job_id: int, attempt: int):
+        with self.lock:
+            self.held[job_id] = attempt
+
+    def release(self, job_id: int, attempt: int) -> bool:
+        # False when the lease was lost in the meantime, i.e. someone else may be doing this job now.
+        with self.lock:
+            if self.held.get(job_id) == attempt:
+                del self.held[job_id]
+            if (job_id, attempt) in self.lost:
+                self.lost.discard((job_id, attempt))
+                return False
+            return True
+
+    def beat(self):
+        with self.lock:
+            leases = list(self.held.items())
+        if not leases:
+            return
+        try:
+            still = set(self.queue.heartbeat(self.worker, leases, self.ttl))
+        except Exception as e:
+            print(f"[!] Heartbeat failed: {e}")
+            return
+        with self.lock:
+            for job_id, attempt in leases:
+                if job_id not in still and self.held.get(job_id) == attempt:
+                    # Stop renewing it; release() reports the loss to the caller.
+                    del self.held[job_id]
+                    self.lost.add((job_id, attempt))
+                    print(f"[!] Lease on job {job_id} was lost")
+
+    def _run(self):
+        while not self.stop_event.wait(self.ttl / 3):
+            self.beat()
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+def _opt(args: List[str], name: str, default=None):
+    if name in args:
+        i = args.index(name)
+        if i + 1 < len(args):
+            return args[i + 1]
+    return default
+
+def main():
+    # init <queue.db> <manifest> [...]                         load manifests into the queue (new rows only)
+    # serve <queue.db> [--host H] [--port P] [--token T]       share the queue with other hosts over HTTP
+    # stats <queue.db | http://host:port> [--token T]
+    # export <queue.db> <out manifest>                         write records back with the workers' results
+    args = sys.argv[1:]
+    cmd = args[0] if args else ""
+    if cmd == "init" and len(args) >= 3:
+        queue = SqliteQueue(args[1])
+        for path in args[2:]:
+            added = queue.enqueue([r.to_dict() for r in load_manifest(path)])
+            print(f"[+] {path}: {added} new jobs")
+        print(f"[*] {queue.stats()}")
+    elif cmd == "serve" and len(args) >= 2:
+        queue = SqliteQueue(args[1])
+        host = _opt(args, "--host", "127.0.0.1")
+        port = int(_opt(args, "--port", DEFAULT_PORT))
+        server = make_server(queue, host, port, _opt(args, "--token"))
+        print(f"[*] Serving {args[1]} on http://{host}:{port} {queue.stats()}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            queue.close()
+    elif cmd == "stats" and len(args) >= 2:
+        print(f"[*] {open_queue(args[1], _opt(args, '--token')).stats()}")
+    elif cmd == "export" and len(args) >= 3:
+        records = SqliteQueue(args[1]).export()
+        save_manifest(args[2], records)
+        print(f"[+] Exported {len(records)} records -> {args[2]}")
+    else:
+        print("usage: python FirmScrap_work_queue.py init <queue.db> <manifest> [...]")
+        print("       python FirmScrap_work_queue.py serve <queue.db> [--host 0.0.0.0] [--port 8765] [--token T]")
+        print("       python FirmScrap_work_queue.py stats <queue.db | http://host:8765> [--token T]")
+        print("       python FirmScrap_work_queue.py export <queue.db> <out manifest>")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import asyncio, aiohttp, json, os, re, sys, tempfile, time, random, html
-from typing import Any, Dict, List, Set, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
+from FirmScrap_negative_cache import load_negative_cache, save_negative_cache, negative_reason, mark_negative, clear_negative
+from FirmScrap_record import FirmwareRecord, load_rows
 
 BASE = "https://www.zyxel.com"
 API_AUTOCOMPLETE = BASE + "/global/en/search_api_autocomplete/product_list_by_model?display=block_1&&field=model_machine_name&filter=model&q={q}"
@@ -10,6 +12,10 @@ OUT_FW = "zyxel_firmware_links.json"
 VENDOR = "Zyxel"
 
 MIN_Q = 3
+MAX_Q = 12
+AUTOCOMPLETE_CAP = 10  # the autocomplete view never returns more than this many suggestions
+EXPAND_CHARS = "abcdefghijklmnopqrstuvwxyz0123456789-"
+PREFIX_RE = re.compile(r"^[a-z0-9-]+$")
 MAX_CONC_SEEDS = 10
 MAX_CONC_FW = 8
 SAVE_MODELS_EVERY = 200
@@ -111,35 +117,49 @@ async def scan_models(seeds: List[str]) -> List[Dict[str,str]]:
         for r in rows:
             v = (r.get("Model") or "").strip()
             if v: seen.add(v.lower())
-    total_seeds = len(seeds)
-    print(f"[*] Total seeds: {total_seeds}")
+    # Prefixes of already known models join the seed list, so new families are reached without editing it.
+    known_prefixes = {k[:MIN_Q] for k in seen if PREFIX_RE.match(k[:MIN_Q])}
+    seeds = list(dict.fromkeys([s.lower().strip() for s in seeds] + sorted(known_prefixes)))
+    print(f"[*] Total seeds: {len(seeds)} ({len(known_prefixes)} from known models)")
     base = len(rows)
     sem = asyncio.Semaphore(MAX_CONC_SEEDS)
     async with aiohttp.ClientSession(headers=headers) as session:
-        async def run_seed(idx: int, seed: str):
-            q = seed.lower().strip()
-            if len(q) < MIN_Q:
-                return 0
-            print(f"[*] [{idx}/{total_seeds}] seed '{seed}': scanning")
+        queried: Set[str] = set()
+        # Every query runs concurrently (bounded by sem). A query whose suggestions hit
+        # AUTOCOMPLETE_CAP may be hiding more models, so it is re-issued with one more character
+        # appended; the 3-character prefix of each newly found model is queried as well.
+        async def expand(q: str):
+            q = q.lower().strip()
+            if len(q) < MIN_Q or q in queried:
+                return
+            queried.add(q)
             async with sem:
                 items = await query_seed(session, q)
             add = 0
+            children: List[str] = []
             for it in items:
                 key = (it["Model"] or "").lower()
                 if key in seen: continue
                 seen.add(key)
                 rows.append(it)
                 add += 1
+                prefix = key[:MIN_Q]
+                if PREFIX_RE.match(prefix) and prefix not in queried:
+                    children.append(prefix)
                 if len(rows) % SAVE_MODELS_EVERY == 0:
                     save_json(OUT_MODELS, rows)
                     print(f"[*] saved {len(rows)} models -> {OUT_MODELS}")
-            print(f"[+] seed '{seed}': +{add} (cumulative {len(rows)})")
-            return add
-        for i, seed in enumerate(seeds, 1):
-            await run_seed(i, seed)
-            if i % 5 == 0:
+            saturated = len(items) >= AUTOCOMPLETE_CAP and len(q) < MAX_Q
+            if saturated:
+                children.extend(q + c for c in EXPAND_CHARS)
+            print(f"[+] query '{q}': {len(items)} hits, +{add} (cumulative {len(rows)}, {len(queried)} queries)"
+                  + (" saturated, expanding" if saturated else ""))
+            if len(queried) % 50 == 0:
                 save_json(OUT_MODELS, rows)
-                print(f"[*] checkpoint: processed {i}/{total_seeds}, total {len(rows)} -> {OUT_MODELS}")
+                print(f"[*] checkpoint: {len(queried)} queries, total {len(rows)} -> {OUT_MODELS}")
+            if children:
+                await asyncio.gather(*(expand(c) for c in children))
+        await asyncio.gather(*(expand(s) for s in seeds))
     if len(rows) > base:
         save_json(OUT_MODELS, rows)
         print(f"[+] Done! {len(rows)} models saved -> {OUT_MODELS}")
@@ -206,7 +226,8 @@ def _is_firmware_link(url: str) -> bool:
     if FW_EXT_RE.search(url) is None: return False
     return True
 
-def extract_firmware_from_html(html: str, model: str) -> List[Dict[str, Any]]:
+# Previous per-row regex parser; only used as the reference in `bench`.
+def _legacy_extract_firmware_from_html(html: str, model: str) -> List[Dict[str, Any]]:
     out = []
     if not html or len(html) < MIN_HTML: return out
     rows = _find_all_rows(html)
@@ -232,26 +253,133 @@ def extract_firmware_from_html(html: str, model: str) -> List[Dict[str, Any]]:
                 rn_url = _find_href_for_modal(html, rn_modal)
         md5, sha256 = _extract_checksums(row, cs_modal) if cs_modal else ("","")
         if fw_url and _is_firmware_link(fw_url):
-            out.append({
-                "Vendor": VENDOR,
-                "Model": model.upper(),
-                "Version": _clean(version),
-                "Release": _clean(rel),
-                "Download": fw_url,
-                "ReleaseNotes": rn_url,
-                "Type": "Firmware"
-            })
+            out.append(FirmwareRecord(
+                vendor=VENDOR,
+                model=model.upper(),
+                version=_clean(version),
+                release=_clean(rel),
+                download=fw_url,
+                release_notes=rn_url,
+                extra={"Type": "Firmware"},
+            ).to_dict())
+    return out
+
+ROW_RE = re.compile(r"<tr\b[^>]*>(.*?)</tr>", re.I|re.S)
+TAG_RE = re.compile(r"<[^>]+>", re.S)
+CELL_RE = {
+    frag: re.compile(rf'class="[^"]*{re.escape(frag)}[^"]*"(?:[^>]*)>(.*?)</td>', re.I|re.S)
+    for frag in ("views-field-nothing-2", "views-field-field-version", "views-field-field-language", "views-field-field-release-date")
+}
+MODAL_ID = r"(?:download-firmware-[A-Za-z0-9_-]+|release-note-[A-Za-z0-9_-]+|checksum-modal[A-Za-z0-9]+)"
+MODAL_TARGET_RE = re.compile(rf'data-target="#({MODAL_ID})"', re.I)
+MODAL_BLOCK_RE = re.compile(rf'id="({MODAL_ID})"[^>]*>(.*?)</div>\s*</div>\s*</div>', re.I|re.S)
+HREF_RE = re.compile(r'href="([^"]+)"', re.I)
+MD5_RE = re.compile(r'MD5:\s*([A-F0-9]{32})', re.I)
+SHA256_RE = re.compile(r'SHA-256:\s*([A-F0-9]{64})', re.I)
+
+def _cell_text(row_html: str, cls_fragment: str) -> str:
+    m = CELL_RE[cls_fragment].search(row_html)
+    return _clean(TAG_RE.sub(" ", m.group(1))) if m else ""
+
+def build_modal_index(html: str) -> Dict[str, Tuple[str, str, str]]:
+    # One pass over the page: modal id -> (first href, MD5, SHA-256) for every download/release-note/checksum modal.
+    index: Dict[str, Tuple[str, str, str]] = {}
+    for m in MODAL_BLOCK_RE.finditer(html):
+        modal_id = m.group(1)
+        if modal_id in index: continue
+        block = m.group(2)
+        href = HREF_RE.search(block)
+        md5 = MD5_RE.search(block)
+        sha256 = SHA256_RE.search(block)
+        index[modal_id] = (
+            href.group(1).strip() if href else "",
+            md5.group(1).upper() if md5 else "",
+            sha256.group(1).upper() if sha256 else "",
+        )
+    return index
+
+def page_complete(html: str) -> bool:
+    # Challenge pages, error stubs and truncated responses are short or never reach </html>.
+    return bool(html) and len(html) >= MIN_HTML and html.rstrip().lower().endswith("</html>")
+
+def extract_firmware_from_html(html: str, model: str) -> Optional[List[Dict[str, Any]]]:
+    # None for a page that did not load completely: not the same as a product with no firmware.
+    out = []
+    if not page_complete(html): return None
+    modals = build_modal_index(html)
+    for row_m in ROW_RE.finditer(html):
+        row = row_m.group(1)
+        if _cell_text(row, "views-field-nothing-2").lower() != "firmware":
+            continue
+        fw_url = rn_url = ""
+        for target in MODAL_TARGET_RE.findall(row):
+            kind = target.lower()
+            if kind.startswith("download-firmware-") and not fw_url:
+                fw_url = modals.get(target, ("", "", ""))[0]
+            elif kind.startswith("release-note-") and not rn_url:
+                rn_url = modals.get(target, ("", "", ""))[0]
+        if fw_url and _is_firmware_link(fw_url):
+            out.append(FirmwareRecord(
+                vendor=VENDOR,
+                model=model.upper(),
+                version=_cell_text(row, "views-field-field-version"),
+                release=_cell_text(row, "views-field-field-release-date"),
+                download=fw_url,
+                release_notes=rn_url,
+                extra={"Type": "Firmware"},
+            ).to_dict())
     return out
 
-async def fetch_firmware_for_model(session: aiohttp.ClientSession, model: str, idx: int, total: int) -> Tuple[str, List[Dict[str, Any]]]:
+def _synthetic_download_page(rows: int) -> str:
+    # Worst case for the legacy parser: every modal sits after the table, outside its row.
+    body, modals = [], []
+    for i in range(rows):
+        body.append(
+            f'<tr><td class="views-field views-field-nothing-2">Firmware</td>'
+            f'<td class="views-field views-field-field-version">V5.{i}(ABCD.0)C0</td>'
+            f'<td class="views-field views-field-field-language">English</td>'
+            f'<td class="views-field views-field-field-release-date">2024-01-{i % 28 + 1:02d}</td>'
+            f'<td><a data-target="#download-firmware-{i}">Download</a>'
+            f'<a data-target="#release-note-{i}">Note</a><a data-target="#checksum-modal{i}">Checksum</a></td></tr>'
+        )
+        modals.append(
+            f'<div class="modal" id="download-firmware-{i}"><div><div><a href="https://download.zyxel.com/GS1900/firmware/GS1900_V5.{i}.zip">zip</a></div></div></div>'
+            f'<div class="modal" id="release-note-{i}"><div><div><a href="https://download.zyxel.com/GS1900/release_note/GS1900_V5.{i}.pdf">pdf</a></div></div></div>'
+            f'<div class="modal" id="checksum-modal{i}"><div><div>MD5: {i:032X} SHA-256: {i:064X}</div></div></div>'
+        )
+    return "<html><body><table>" + "".join(body) + "</table>" + "".join(modals) + "</body></html>" + " " * MIN_HTML
+
+def bench(paths: List[str], rounds: int = 1):
+    pages = []
+    for p in paths:
+        with open(p, "r", encoding="utf-8", errors="ignore") as f:
+            pages.append((os.path.basename(p), f.read()))
+    if not pages:
+        pages = [(f"synthetic-{n}-rows", _synthetic_download_page(n)) for n in (100, 200, 400)]
+    for name, page in pages:
+        timings = {}
+        outputs = {}
+        for label, fn in (("legacy", _legacy_extract_firmware_from_html), ("indexed", extract_firmware_from_html)):
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                outputs[label] = fn(page, "bench") or []
+            timings[label] = (time.perf_counter() - t0) / rounds
+            print(f"[*] {name} ({len(page)/1e6:.2f} MB) {label:>7}: {len(outputs[label])} rows, {timings[label]*1000:.1f} ms")
+        same = "same rows" if outputs["legacy"] == outputs["indexed"] else "ROWS DIFFER"
+        print(f"[+] {name}: {timings['legacy']/timings['indexed']:.1f}x speedup, {same}")
+
+async def fetch_firmware_for_model(session: aiohttp.ClientSession, model: str, idx: int, total: int) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+    # items is None when the page could not be fetched, so callers can tell failures from "no firmware".
     url = PAGE_DOWNLOAD.format(model=model)
     print(f"[*] [{idx}/{total}] {model}: fetching product page")
     html = await http_get_text(session, url)
     if not html:
         print(f"[-] [{idx}/{total}] {model}: product page fetch failed")
-        return model, []
+        return model, None
     items = extract_firmware_from_html(html, model)
-    if not items:
+    if items is None:
+        print(f"[-] [{idx}/{total}] {model}: incomplete product page ({len(html)} chars)")
+    elif not items:
         print(f"[-] [{idx}/{total}] {model}: no firmware found")
     else:
         print(f"[+] [{idx}/{total}] {model}: {len(items)} firmware entries")
@@ -265,11 +393,14 @@ async def harvest_firmware(models: List[Dict[str,str]]):
         if not v: continue
         targets.append(v)
     targets = sorted(set(targets), key=lambda x: x.lower())
+    negative = load_negative_cache(VENDOR)
+    skipped = [t for t in targets if negative_reason(negative, VENDOR, t.lower())]
+    if skipped:
+        print(f"[*] Skipping {len(skipped)} models cached as negative")
+        targets = [t for t in targets if not negative_reason(negative, VENDOR, t.lower())]
     total = len(targets)
     print(f"[*] Total models: {total}")
-    records: List[Dict[str, Any]] = []
-    old = load_json(OUT_FW)
-    if isinstance(old, list): records = old
+    records: List[Dict[str, Any]] = load_rows(OUT_FW, VENDOR)
     seen = {(r.get("Model",""), r.get("Download","")) for r in records}
     headers = {"User-Agent": random.choice(UA), "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"}
     sem = asyncio.Semaphore(MAX_CONC_FW)
@@ -280,13 +411,17 @@ async def harvest_firmware(models: List[Dict[str,str]]):
                     return await fetch_firmware_for_model(session, model, i, total)
                 except Exception:
                     print(f"[-] [{i}/{total}] {model}: exception")
-                    return model, []
+                    return model, None
         coros = [task(i+1, m) for i, m in enumerate(targets)]
         base = len(records); done = 0
         for fut in asyncio.as_completed(coros):
             model, items = await fut
+            if items == []:
+                mark_negative(negative, VENDOR, model.lower(), "no firmware found")
+            elif items:
+                clear_negative(negative, VENDOR, model.lower())
             added = 0
-            for r in items:
+            for r in items or []:
                 key = (r.get("Model",""), r.get("Download",""))
                 if key in seen: continue
                 seen.add(key)
@@ -314,18 +449,23 @@ async def harvest_firmware(models: List[Dict[str,str]]):
                     save_json(OUT_FW, records)
                     print(f"[*] checkpoint(retry): processed {done}/{total}, total {len(records)} -> {OUT_FW}")
         save_json(OUT_FW, records)
+        save_negative_cache(VENDOR, negative)
         print(f"[+] Firmware saved: total {len(records)} -> {OUT_FW}")
 
 async def main_async():
     seeds = ["ant","armor","cx-","emg","es-","ex-","es1","fwa","gs-","gs1","gs2","lte","mg-","mg1","multy","nap","nas","nbg","nr-","nsg","nsw","nwa","nwd","nxc","pla","poe","rgs","rps","sur","stb","scr","usg","vmg","vpn","wac","wap","wre","wax","wbe","xs-","xgs","xmg","zywall"]
     models = load_json(OUT_MODELS)
-    if not models:
+    if not models or "--rescan" in sys.argv[1:]:
         models = await scan_models(seeds)
     else:
         print(f"[*] Using existing models: {len(models)} from {OUT_MODELS}")
     await harvest_firmware(models)
 
 def main():
+    args = sys.argv[1:]
+    if args and args[0] == "bench":
+        bench(args[1:])
+        return
     asyncio.run(main_async())
 
 if __name__ == "__main__":
@@ -0,0 +1,56 @@
+import lzma
+import random
+
+import pytest
+
+import FirmScrap_entropy as entropy
+from FirmScrap_entropy import profile_file, verdict
+
+def text(seed, n):
+    rng = random.Random(seed)
+    words = [bytes(rng.choice(b"abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9))) for _ in range(5000)]
+    return b" ".join(rng.choice(words) for _ in range(n))
+
+@pytest.fixture(scope="module")
+def files(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("entropy")
+    data = text(1, 150000)
+    paths = {
+        "random": random.Random(2).randbytes(1 << 20),
+        "xz": lzma.compress(data),
+        "lzma": b"\x00" * 64 + lzma.compress(data, format=lzma.FORMAT_ALONE),
+        "plain": data,
+        "empty": b"",
+    }
+    out = {}
+    for name, blob in paths.items():
+        p = tmp_path / f"{name}.bin"
+        p.write_bytes(blob)
+        out[name] = str(p)
+    return out
+
+def test_verdicts(files):
+    assert profile_file(files["random"])["Verdict"] == "encrypted"
+    for name in ("xz", "lzma"):
+        r = profile_file(files[name])
+        # LZMA output is as uniform as random data; only the header tells them apart.
+        assert r["ChiSquare"] < entropy.RANDOM_CHI_SQUARE
+        assert r["Verdict"] == "compressed" and r["Formats"]
+    assert profile_file(files["plain"])["Verdict"] == "plain"
+    assert profile_file(files["empty"])["Verdict"] == "empty"
+
+def test_verdict_thresholds():
+    assert verdict(0.95, 250.0) == "encrypted"
+    assert verdict(0.95, 250.0, ["xz"]) == "compressed"
+    assert verdict(0.95, 5000.0) == "compressed"
+    assert verdict(0.5, 250.0) == "mixed"
+    assert verdict(0.1, 250.0) == "plain"
+
+def test_pure_python_profiler_matches(files, monkeypatch):
+    if entropy.np is None:
+        pytest.skip("NumPy not installed")
+    fast = profile_file(files["xz"])
+    monkeypatch.setattr(entropy, "np", None)
+    slow = profile_file(files["xz"])
+    assert slow["Histogram"] == fast["Histogram"]
+    assert slow["Curve"] == fast["Curve"] and slow["Verdict"] == fast["Verdict"]
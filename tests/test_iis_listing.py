@@ -0,0 +1,57 @@
+from FirmScrap_iis_listing import (
+    conditional_headers, is_unchanged, load_listing_index, parse_listing, remember_listing,
+    save_listing_index, stored_entries,
+)
+
+LISTING = """<html><head><title>legacyfiles.us.dlink.com - /DIR-615/</title></head><body><H1>/DIR-615/</H1><hr>
+<pre><A HREF="/">[To Parent Directory]</A><br><br> 1/15/2019  3:22 PM        &lt;dir&gt; <A HREF="/DIR-615/REVA/">REVA</A><br>12/3/2020 11:05 AM     4194304 <A HREF="/DIR-615/DIR-615_FIRMWARE_4.00.ZIP">DIR-615_FIRMWARE_4.00.ZIP</A><br> 2/9/2021  9:41 PM        12345 <a href="/DIR-615/Notes%20&amp;%20Docs.pdf">Notes &amp; Docs.pdf</a><br></pre><hr></body></html>"""
+
+def test_parse_listing():
+    entries = parse_listing(LISTING)
+    assert [e["name"] for e in entries] == ["REVA", "DIR-615_FIRMWARE_4.00.ZIP", "Notes & Docs.pdf"]
+    reva, fw, notes = entries
+    assert reva["is_dir"] and reva["size"] is None and reva["stamp"] == "2019-01-15 15:22"
+    assert not fw["is_dir"] and fw["size"] == 4194304 and fw["stamp"] == "2020-12-03 11:05"
+    assert notes["href"] == "/DIR-615/Notes%20&%20Docs.pdf" and notes["stamp"] == "2021-02-09 21:41"
+
+def test_parse_listing_without_pre():
+    assert parse_listing("<html><body>Service Unavailable</body></html>") == []
+    assert parse_listing("") == []
+
+def test_remember_listing_reports_changes():
+    index = {}
+    entries = parse_listing(LISTING)
+    assert remember_listing(index, "u", "2020-12-03 11:05", entries, "Thu, 03 Dec 2020 11:05:00 GMT")
+    assert not remember_listing(index, "u", "2020-12-03 11:05", entries, "Thu, 03 Dec 2020 11:05:00 GMT")
+    entries[1]["size"] = 1
+    assert remember_listing(index, "u", "2020-12-03 11:05", entries)
+
+def test_is_unchanged_only_vouches_for_leaf_directories():
+    index = {}
+    leaf = [e for e in parse_listing(LISTING) if not e["is_dir"]]
+    remember_listing(index, "leaf", "2020-12-03 11:05", leaf)
+    remember_listing(index, "parent", "2020-12-03 11:05", parse_listing(LISTING))
+    assert is_unchanged(index, "leaf", "2020-12-03 11:05")
+    assert not is_unchanged(index, "leaf", "2021-01-01 00:00")
+    assert not is_unchanged(index, "leaf", None)
+    assert not is_unchanged(index, "unknown", "2020-12-03 11:05")
+    # A grandchild change does not move the parent's stamp, so a directory with subdirectories is always revisited.
+    assert not is_unchanged(index, "parent", "2020-12-03 11:05")
+
+def test_index_round_trip(tmp_path):
+    index = {}
+    remember_listing(index, "u", "2020-12-03 11:05", parse_listing(LISTING), "Thu, 03 Dec 2020 11:05:00 GMT")
+    path = str(tmp_path / "index.json")
+    save_listing_index(path, index)
+    loaded = load_listing_index(path)
+    assert loaded == index
+    assert conditional_headers(loaded, "u") == {"If-Modified-Since": "Thu, 03 Dec 2020 11:05:00 GMT"}
+    assert conditional_headers(loaded, "other") == {}
+    assert [(e["href"], e["is_dir"]) for e in stored_entries(loaded, "u")] == [
+        (e["href"], e["is_dir"]) for e in parse_listing(LISTING)]
+
+def test_corrupt_index_loads_empty(tmp_path):
+    path = tmp_path / "index.json"
+    path.write_text("{not json", encoding="utf-8")
+    assert load_listing_index(str(path)) == {}
+    assert load_listing_index(str(tmp_path / "missing.json")) == {}
@@ -0,0 +1,35 @@
+from FirmScrap_link_probe import apply_probe, is_alive, prune_dead
+from FirmScrap_record import FirmwareRecord
+
+OK = {"Status": 200, "ContentType": "application/zip", "Length": 1024}
+NOT_FOUND = {"Status": 404, "ContentType": "text/html"}
+GONE = {"Status": 410}
+NXDOMAIN = {"Status": None, "Error": "NXDOMAIN"}
+TIMEOUT = {"Status": None, "Error": "TimeoutError"}
+SERVER_ERROR = {"Status": 503}
+HTML_PAGE = {"Status": 200, "ContentType": "text/html"}
+
+def sweep(*results):
+    rec = FirmwareRecord(vendor="Zyxel", model="GS1900", download="https://example.com/fw.zip")
+    for res in results:
+        apply_probe(rec, res)
+    return rec
+
+def test_alive():
+    assert is_alive(OK)
+    assert not is_alive(HTML_PAGE) and not is_alive(NOT_FOUND) and not is_alive(TIMEOUT)
+
+def test_only_definitive_failures_count():
+    assert sweep(NOT_FOUND, GONE).extra["DeadCount"] == 2
+    assert sweep(NXDOMAIN, NXDOMAIN).extra["DeadCount"] == 2
+    assert sweep(TIMEOUT, SERVER_ERROR, HTML_PAGE).extra["DeadCount"] == 0
+    assert sweep(NOT_FOUND, TIMEOUT).extra["DeadCount"] == 1
+
+def test_alive_resets_the_count():
+    rec = sweep(NOT_FOUND, OK)
+    assert rec.extra["DeadCount"] == 0 and rec.extra["Alive"]
+    assert "ProbeError" not in sweep(TIMEOUT, OK).extra
+
+def test_prune_after_two_definitive_failures():
+    keep, dead = prune_dead([sweep(NOT_FOUND, NOT_FOUND), sweep(TIMEOUT, TIMEOUT), sweep(NOT_FOUND), sweep(OK)])
+    assert len(dead) == 1 and len(keep) == 3
@@ -0,0 +1,54 @@
+from FirmScrap_manifest_diff import delta_records, diff_records
+from FirmScrap_record import FirmwareRecord
+
+def rec(model="GS1900", version="V2.70", download="https://dl.example.com/fw/gs1900_v270.zip", **extra):
+    return FirmwareRecord(vendor="Zyxel", model=model, version=version, release="2024-01-02",
+                          download=download, extra=extra or None)
+
+def test_identical_snapshots():
+    diff = diff_records([rec(), rec(model="XGS1250")], [rec(model="XGS1250"), rec()])
+    assert diff["unchanged"] == 2
+    assert not diff["added"] and not diff["removed"] and not diff["changed"]
+    assert delta_records(diff) == []
+
+def test_added_and_removed():
+    diff = diff_records([rec(model="OLD")], [rec(model="NEW")])
+    assert [r.model for r in diff["added"]] == ["NEW"]
+    assert [r.model for r in diff["removed"]] == ["OLD"]
+    assert [(r.model, r.extra["Change"]) for r in delta_records(diff)] == [("NEW", "added")]
+
+def test_rehosted_release_joins_on_version():
+    old = rec(download="https://old.example.com/a/gs1900.zip")
+    new = rec(download="https://new.example.com/b/gs1900-final.zip")
+    diff = diff_records([old], [new])
+    assert not diff["added"] and not diff["removed"]
+    (_, _, fields), = diff["changed"]
+    assert fields == ["download"]
+    assert delta_records(diff)[0].extra["ChangedFields"] == ["download"]
+
+def test_moved_file_joins_on_file_name():
+    old = rec(version="", download="https://old.example.com/gs1900_v270.zip")
+    new = rec(version="", download="https://cdn.example.com/x/GS1900_V270.zip")
+    diff = diff_records([old], [new])
+    assert len(diff["changed"]) == 1 and not diff["added"]
+
+def test_version_only_change_is_not_downloaded_again():
+    diff = diff_records([rec(version="V2.70")], [rec(version="V2.70(ABTQ.0)")])
+    assert diff["changed"][0][2] == ["version"]
+    assert delta_records(diff) == []
+
+def test_size_compared_only_from_the_same_source():
+    # A probed Content-Length against a vendor "25.6 MB" label is not a change.
+    diff = diff_records([rec(Size="25.6 MB")], [rec(Size="25.6 MB", Length=26843545)])
+    assert diff["unchanged"] == 1
+    diff = diff_records([rec(Length=100)], [rec(Length=200)])
+    assert diff["changed"][0][2] == ["size"]
+    assert len(delta_records(diff)) == 1
+
+def test_duplicate_keys_fall_through_to_later_passes():
+    old = [rec(version="V1", download="https://a/x.zip"), rec(version="V1", download="https://a/y.zip")]
+    new = [rec(version="V1", download="https://a/x.zip"), rec(version="V1", download="https://b/y.zip")]
+    diff = diff_records(old, new)
+    assert diff["unchanged"] == 1
+    assert not diff["added"] and not diff["removed"]
+    assert len(diff["changed"]) == 1
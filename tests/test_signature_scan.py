@@ -0,0 +1,84 @@
+import gzip
+import lzma
+import random
+import struct
+
+import pytest
+
+import FirmScrap_signature_scan as sigscan
+from FirmScrap_signature_scan import scan_file, scan_mapped
+
+PAD = b"\x00" * 64
+
+def names(buf):
+    hits, _ = scan_mapped(buf, len(buf))
+    return [h["Name"] for h in hits]
+
+def squashfs(version=4):
+    return b"hsqs" + b"\x01" * 24 + struct.pack("<H", version) + b"\x00" * 34
+
+def uimage(data_len):
+    return b"\x27\x05\x19\x56" + b"\x00" * 8 + struct.pack(">I", data_len) + b"\x00" * 48
+
+def trx(total_len):
+    return b"HDR0" + struct.pack("<I", total_len) + b"\x00" * 24
+
+@pytest.mark.parametrize("blob,expected", [
+    (squashfs(4), "squashfs-le"),
+    (b"\x45\x3d\xcd\x28" + b"\x00" * 12 + b"Compressed ROMFS" + b"\x00" * 32, "cramfs-le"),
+    (b"\x28\xcd\x3d\x45" + b"\x00" * 12 + b"Compressed ROMFS" + b"\x00" * 32, "cramfs-be"),
+    (gzip.compress(b"firmware" * 100), "gzip"),
+    (lzma.compress(b"firmware" * 100, format=lzma.FORMAT_ALONE), "lzma"),
+    (lzma.compress(b"firmware" * 100), "xz"),
+    (b"UBI#\x01\x00\x00\x00" + b"\x00" * 56, "ubi"),
+])
+def test_valid_headers_are_found(blob, expected):
+    assert expected in names(PAD + blob + PAD)
+
+def test_length_fields_must_fit_the_file():
+    body = b"\x00" * 1000
+    assert "uimage" in names(PAD + uimage(len(body)) + body)
+    assert "uimage" not in names(PAD + uimage(1 << 30) + body)
+    assert "trx" in names(PAD + trx(28 + len(body)) + body)
+    assert "trx" not in names(PAD + trx(1 << 30) + body)
+
+@pytest.mark.parametrize("blob,name", [
+    (squashfs(9), "squashfs-le"),
+    (b"\x45\x3d\xcd\x28" + b"\x00" * 44, "cramfs-le"),
+    (b"\x5d\x00\x00\x00\x00\x00\x03" + b"\x00" * 16, "lzma"),
+    (b"UBI#\x07\x00\x00\x00" + b"\x00" * 56, "ubi"),
+    (b"\x31\x18\x10\x06" + b"\xff" * 60, "ubifs"),
+    (b"\x85\x19\x03\x20" + struct.pack("<I", 1 << 20) + b"\x00" * 8, "jffs2-le"),
+])
+def test_chance_matches_are_rejected(blob, name):
+    assert name not in names(PAD + blob + PAD)
+
+def test_header_cut_off_at_end_of_file():
+    assert names(PAD + squashfs(4)[:20]) == []
+
+def test_random_data_has_no_container_headers():
+    data = random.Random(1).randbytes(8 << 20)
+    found = set(names(data))
+    assert not found & {"squashfs-le", "squashfs-be", "cramfs-le", "cramfs-be", "ubi", "ubifs", "jffs2-le", "xz", "bzip2"}
+
+def test_hits_are_sorted_by_offset():
+    buf = PAD + trx(100) + PAD + squashfs(4) + PAD
+    hits, truncated = scan_mapped(buf, len(buf))
+    assert [h["Name"] for h in hits] == ["trx", "squashfs-le"]
+    assert hits[0]["Offset"] == len(PAD) and truncated == []
+
+def test_candidate_cap(monkeypatch):
+    monkeypatch.setattr(sigscan, "MAX_CANDIDATES_PER_SIGNATURE", 10)
+    buf = b"\x5d\x00\x00\x01" * 100
+    hits, truncated = scan_mapped(buf, len(buf))
+    assert truncated == ["lzma"]
+
+def test_scan_file(tmp_path):
+    path = tmp_path / "image.bin"
+    path.write_bytes(PAD + squashfs(4) + PAD)
+    result = scan_file(str(path))
+    assert [h["Name"] for h in result["Signatures"]] == ["squashfs-le"]
+    assert len(result["SHA256"]) == 64
+    empty = tmp_path / "empty.bin"
+    empty.write_bytes(b"")
+    assert scan_file(str(empty))["Signatures"] == []
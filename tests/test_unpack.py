@@ -0,0 +1,76 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+import FirmScrap_unpack as unpack
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+
+def make_tgz(path, members):
+    with tarfile.open(path, "w:gz") as tf:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+
+@pytest.mark.parametrize("name,expected", [
+    ("fw/image.bin", "fw/image.bin"),
+    ("./a/../image.bin", "image.bin"),
+    ("/etc/passwd", "etc/passwd"),
+    ("..\\..\\evil.bin", None),
+    ("../evil.bin", None),
+    ("a/../../evil.bin", None),
+    ("..", None),
+    (".", None),
+    ("", None),
+])
+def test_safe_name(name, expected):
+    assert unpack._safe_name(name) == expected
+
+def test_zip_traversal_members_are_skipped(tmp_path):
+    archive = tmp_path / "fw.zip"
+    make_zip(archive, {"../evil.bin": b"x", "fw/image.bin": b"HDR0" + b"\0" * 60, "notes.pdf": b"%PDF-1.4"})
+    result = unpack.unpack_file(str(archive))
+    assert "Error" not in result
+    assert [m["Name"] for m in result["Members"]] == ["fw/image.bin", "notes.pdf"]
+    assert result["Firmware"] == "fw/image.bin"
+    assert not (tmp_path / "evil.bin").exists()
+
+def test_tar_traversal_members_are_skipped(tmp_path):
+    archive = tmp_path / "fw.tar.gz"
+    make_tgz(archive, {"../../evil.bin": b"x", "image.trx": b"HDR0" + b"\0" * 60})
+    result = unpack.unpack_file(str(archive))
+    assert [m["Name"] for m in result["Members"]] == ["image.trx"]
+    assert not (tmp_path / "evil.bin").exists()
+
+def test_member_count_cap(tmp_path, monkeypatch):
+    monkeypatch.setattr(unpack, "MAX_MEMBERS", 3)
+    archive = tmp_path / "many.zip"
+    make_zip(archive, {f"f{i}.bin": b"x" for i in range(5)})
+    result = unpack.unpack_file(str(archive))
+    assert "more than 3 members" in result["Error"]
+    assert not os.path.exists(f"{archive}.extracted")
+
+def test_total_size_cap(tmp_path, monkeypatch):
+    monkeypatch.setattr(unpack, "CHUNK_SIZE", 1024)
+    monkeypatch.setattr(unpack, "MAX_MEMBER_BYTES", 4096)
+    monkeypatch.setattr(unpack, "MAX_TOTAL_BYTES", 10000)
+    archive = tmp_path / "bomb.tar.gz"
+    # Every member stays under the per-member cap; together they do not.
+    make_tgz(archive, {f"part{i}.bin": b"\0" * 4000 for i in range(4)})
+    result = unpack.unpack_file(str(archive))
+    assert "expands to more than 10000 bytes" in result["Error"]
+    assert not os.path.exists(f"{archive}.extracted")
+
+def test_member_size_cap(tmp_path, monkeypatch):
+    monkeypatch.setattr(unpack, "CHUNK_SIZE", 1024)
+    monkeypatch.setattr(unpack, "MAX_MEMBER_BYTES", 4096)
+    archive = tmp_path / "big.zip"
+    make_zip(archive, {"big.bin": b"\0" * 5000})
+    assert "member larger than 4096 bytes" in unpack.unpack_file(str(archive))["Error"]
@@ -0,0 +1,56 @@
+from FirmScrap_work_queue import Heartbeat, SqliteQueue
+
+RECORD = {"Vendor": "Zyxel", "Model": "GS1900", "Version": "V2.70", "Download": "https://example.com/gs1900.zip"}
+
+def make_queue(tmp_path, max_attempts=5):
+    q = SqliteQueue(str(tmp_path / "queue.db"), max_attempts=max_attempts)
+    q.enqueue([RECORD])
+    return q
+
+def test_enqueue_is_idempotent(tmp_path):
+    q = make_queue(tmp_path)
+    assert q.enqueue([RECORD]) == 0
+    assert q.stats()["pending"] == 1
+
+def test_stale_worker_cannot_report(tmp_path):
+    q = make_queue(tmp_path)
+    first = q.lease("a", 1, ttl=-1)[0]
+    second = q.lease("b", 1, ttl=60)[0]
+    assert second["Id"] == first["Id"] and second["Attempt"] == first["Attempt"] + 1
+    assert not q.complete("a", first["Id"], first["Attempt"], {})
+    assert not q.fail("a", first["Id"], first["Attempt"], "late")
+    assert q.complete("b", second["Id"], second["Attempt"], {"Sha256": "x"})
+    assert q.stats()["done"] == 1
+
+def test_expired_lease_fails_after_max_attempts(tmp_path):
+    q = make_queue(tmp_path, max_attempts=2)
+    q.lease("a", 1, ttl=-1)
+    q.lease("a", 1, ttl=-1)
+    assert q.lease("a", 1, ttl=60) == []
+    assert q.stats()["failed"] == 1
+
+def test_heartbeat_renews_held_leases(tmp_path):
+    q = make_queue(tmp_path)
+    job = q.lease("a", 1, ttl=60)[0]
+    hb = Heartbeat(q, "a", ttl=60)
+    hb.add(job["Id"], job["Attempt"])
+    hb.beat()
+    assert hb.release(job["Id"], job["Attempt"])
+
+def test_lease_lost_then_leased_again(tmp_path):
+    q = make_queue(tmp_path)
+    hb = Heartbeat(q, "a", ttl=60)
+    lost = q.lease("a", 1, ttl=-1)[0]
+    hb.add(lost["Id"], lost["Attempt"])
+    # Another worker takes the expired job, so the next heartbeat finds the lease gone.
+    other = q.lease("b", 1, ttl=-1)[0]
+    hb.beat()
+    # The job expires again and comes back to the first worker under a new attempt.
+    again = q.lease("a", 1, ttl=60)[0]
+    assert again["Id"] == lost["Id"] and again["Attempt"] > other["Attempt"]
+    hb.add(again["Id"], again["Attempt"])
+    hb.beat()
+    assert hb.release(again["Id"], again["Attempt"])
+    assert q.complete("a", again["Id"], again["Attempt"], {})
+    assert not hb.release(lost["Id"], lost["Attempt"])
+    assert q.stats()["done"] == 1